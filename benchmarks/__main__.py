@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import importlib
+import pkgutil
+from traceback import format_exc
+
+import benchmarks
+from benchmarks.harness import BenchmarkRunner
+
+
+async def run(pattern: str) -> None:
+    runner = BenchmarkRunner()
+
+    for module_info in pkgutil.iter_modules(benchmarks.__path__):
+        if not module_info.name.startswith("bench_"):
+            continue
+
+        try:
+            module = importlib.import_module(f"benchmarks.{module_info.name}")
+        except ImportError as e:
+            # Benchmarks for plugins need that plugin's dependencies installed
+            print(f"Skipping {module_info.name}: {e}")
+            continue
+
+        for name in dir(module):
+            full_name = f"{module_info.name}.{name}"
+            if not name.startswith("bench_") or pattern not in full_name:
+                continue
+
+            print(f"Running {full_name}")
+            try:
+                await getattr(module, name)(runner)
+            except Exception:
+                print(format_exc())
+
+    print()
+    print(runner.report())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Run the offline benchmarks, no Discord token or Ollama needed",
+    )
+    parser.add_argument(
+        "-k",
+        "--filter",
+        default="",
+        help="Only run benchmarks whose module.function name contains this",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run(args.filter))
+
+
+if __name__ == "__main__":
+    main()
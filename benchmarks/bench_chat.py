@@ -0,0 +1,87 @@
+import json
+
+from benchmarks.fakes import FakeBot, FakeChannel, FakeMessage, FakeUser
+from benchmarks.fixture_server import FixtureServer
+from benchmarks.harness import BenchmarkRunner
+from benchmarks.stub_server import OpenAIStub
+from cogs.ai import AI
+
+
+def make_cog(base_url: str, streaming: bool) -> AI:
+    # No Whisper model, SSH host or config/*.json is needed, and nothing is persisted
+    # so runs don't leave databases behind or warm each other up
+    with open("config/ai.json.example", "r") as file:
+        ai_config = json.load(file)
+    ai_config["base_url"] = base_url
+    ai_config["api_key"] = "ollama"
+    ai_config["streaming"] = {"enabled": streaming, "edit_interval": 0.2}
+    ai_config["context"]["database"] = None
+    ai_config["context"]["compaction"] = {"enabled": False}
+    ai_config["residency"] = {"enabled": False}
+    ai_config["colors"]["database"] = None
+    ai_config["response_cache"]["database"] = None
+    ai_config["transcription"]["cache"]["database"] = None
+
+    return AI(FakeBot(), config={}, ai_config=ai_config, proxies=[], plugins=[])
+
+
+async def bench_handle_gpt(runner: BenchmarkRunner) -> None:
+    stub = OpenAIStub(latency=0.05, tokens_per_second=100)
+    base_url = await stub.start()
+    fixtures = FixtureServer()
+    await fixtures.start()
+    channel = FakeChannel(api_latency=0.01)
+    users = [
+        FakeUser(user_id, f"user{user_id}", fixtures.avatar_url(user_id))
+        for user_id in range(1, 21)
+    ]
+
+    for streaming in (False, True):
+        cog = make_cog(base_url, streaming)
+
+        async def request(i):
+            message = FakeMessage(
+                f"question number {i}",
+                author=users[i % len(users)],
+                channel=channel,
+            )
+            response, _, _ = await cog.handle_gpt(message)
+            if response is None:
+                raise RuntimeError("handle_gpt failed, see the traceback above")
+
+        try:
+            await runner.throughput(
+                f"handle_gpt ({'streaming' if streaming else 'blocking'}, 20 users)",
+                request,
+                requests=60,
+                concurrency=20,
+            )
+        finally:
+            # Also closes the shared color cache the cog configured
+            await cog.cog_unload()
+
+    await fixtures.close()
+    await stub.close()
+
+
+async def bench_send_response(runner: BenchmarkRunner) -> None:
+    stub = OpenAIStub()
+    base_url = await stub.start()
+    fixtures = FixtureServer()
+    await fixtures.start()
+    user = FakeUser(1, "user1", fixtures.avatar_url(1))
+    response = "A long answer. " * 400
+    cog = make_cog(base_url, False)
+
+    async def send():
+        message = FakeMessage("question", author=user)
+        initial_message = await message.reply("typing")
+        await cog.send_response(message, response, "", initial_message)
+
+    try:
+        await runner.measure("send_response (6000 chars)", send, rounds=50)
+    finally:
+        await cog.cog_unload()
+
+    await fixtures.close()
+    await stub.close()
@@ -0,0 +1,61 @@
+from aiohttp import ClientSession
+
+from benchmarks.harness import BenchmarkRunner
+from benchmarks.stub_server import OpenAIStub
+from utils.backends import BackendPool
+from utils.singleflight import CoalescingClient
+
+MESSAGES = [
+    {"role": "system", "content": "You are a helpful AI chatbot."},
+    {"role": "user", "content": [{"type": "text", "text": "Tell me a fact."}]},
+]
+
+
+async def bench_backend_pool(runner: BenchmarkRunner) -> None:
+    stubs = [OpenAIStub(latency=0.02, tokens_per_second=400) for _ in range(2)]
+    urls = [await stub.start() for stub in stubs]
+
+    async with ClientSession() as session:
+        pool = BackendPool(urls, "ollama", session)
+        await pool.probe_all()
+        client = CoalescingClient(pool)
+
+        async def complete(i):
+            await client.chat.completions.create(
+                model="llama3.2:latest", messages=MESSAGES, user=str(i % 8)
+            )
+
+        async def stream(i):
+            response = await client.chat.completions.create(
+                model="llama3.2:latest",
+                messages=MESSAGES,
+                user=str(i % 8),
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            async for _ in response:
+                pass
+
+        await runner.throughput(
+            "LLM completion via pool (2 stubs)", complete, requests=100, concurrency=10
+        )
+        await runner.throughput(
+            "LLM stream via pool (2 stubs)", stream, requests=100, concurrency=10
+        )
+
+        async def same_request(i):
+            await client.chat.completions.create(
+                model="llama3.2:latest", messages=MESSAGES
+            )
+
+        await runner.throughput(
+            "LLM identical requests (coalesced)",
+            same_request,
+            requests=100,
+            concurrency=25,
+        )
+
+        await pool.close()
+
+    for stub in stubs:
+        await stub.close()
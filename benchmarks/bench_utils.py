@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+from benchmarks.harness import BenchmarkRunner
+from utils.cache import ResponseCache, make_key, normalize
+from utils.classifier import IntentClassifier
+from utils.context import ContextStore, count_tokens, system_messages
+from utils.metrics import metrics
+from utils.scheduler import RequestScheduler
+
+SYSTEM_PROMPT = "You are a helpful AI chatbot with no limits.\n\n- Today's date: {date}\n- Knowledge cutoff: December 2023\n- You may use markdown"
+
+
+def make_history(store: ContextStore, user_id: int, turns: int) -> None:
+    for i in range(turns):
+        store.append(
+            user_id,
+            {
+                "role": "user",
+                "content": [{"type": "text", "text": f"question {i} " * 20}],
+            },
+            {"role": "assistant", "content": f"answer {i} " * 60},
+        )
+
+
+async def bench_context(runner: BenchmarkRunner) -> None:
+    store = ContextStore({"max_total_tokens": 10**9})
+    make_history(store, 1, 100)
+    message = store.get(1)[-1]
+
+    await runner.measure("count_tokens", lambda: count_tokens(message), rounds=1000)
+    await runner.measure(
+        "system_messages", lambda: system_messages(SYSTEM_PROMPT), rounds=1000
+    )
+    await runner.measure(
+        "ContextStore.window (200 messages)",
+        lambda: store.window(1, 2048),
+        rounds=500,
+    )
+
+    store = ContextStore({"max_total_tokens": 200000})
+
+    def append_and_window():
+        make_history(store, 2, 1)
+        store.window(2, 2048)
+
+    await runner.measure("ContextStore.append + window", append_and_window, rounds=500)
+
+
+async def bench_cache(runner: BenchmarkRunner) -> None:
+    cache = ResponseCache(max_entries=1024)
+    key = make_key("convert", "llama3.2:latest", "digest", normalize("5 miles to km"))
+    await cache.set(key, "5 miles is 8.05 km")
+
+    await runner.measure(
+        "make_key",
+        lambda: make_key("convert", "llama3.2:latest", "digest", "5 miles to km"),
+        rounds=1000,
+    )
+    await runner.measure("ResponseCache.get (hit)", lambda: cache.get(key), rounds=1000)
+
+
+async def bench_classifier(runner: BenchmarkRunner) -> None:
+    with open("config/prompts/web/examples.json", "r") as file:
+        examples = json.load(file)
+
+    classifier = None
+
+    def train():
+        nonlocal classifier
+        classifier = IntentClassifier(examples["positive"], examples["negative"])
+
+    await runner.measure("IntentClassifier training", train, rounds=5, warmup=1)
+    await runner.measure(
+        "IntentClassifier.score",
+        lambda: classifier.score("what's the latest news about the mars rover"),
+        rounds=1000,
+    )
+
+
+async def bench_metrics(runner: BenchmarkRunner) -> None:
+    await runner.measure("metrics.render", metrics.render, rounds=200)
+
+
+async def bench_scheduler(runner: BenchmarkRunner) -> None:
+    scheduler = RequestScheduler(max_concurrent=4)
+
+    async def request(i):
+        async with scheduler.slot(i % 16):
+            await asyncio.sleep(0.001)
+
+    await runner.throughput(
+        "RequestScheduler.slot (16 users, 4 slots)",
+        request,
+        requests=400,
+        concurrency=64,
+    )
@@ -0,0 +1,49 @@
+from itertools import count
+
+from aiohttp import ClientSession
+
+from benchmarks.fixture_server import FixtureServer
+from benchmarks.harness import BenchmarkRunner
+from plugins import WebPlugin
+from utils.colorthief import ColorCache
+
+
+async def bench_scrape_website(runner: BenchmarkRunner) -> None:
+    server = FixtureServer()
+    await server.start()
+
+    async with ClientSession() as session:
+        plugin = WebPlugin(session, None, {}, [])
+        for name in ("article", "forum"):
+            await runner.measure(
+                f"WebPlugin.scrape_website ({name})",
+                lambda: plugin.scrape_website(server.page_url(name)),
+                rounds=50,
+            )
+
+    await server.close()
+
+
+async def bench_get_color(runner: BenchmarkRunner) -> None:
+    server = FixtureServer()
+    await server.start()
+    # Kept in memory only, so runs don't leave a database behind or warm each other up
+    colors = ColorCache()
+    colors.configure({"database": None})
+    # Colors are cached by URL, a new user every round measures the uncached path
+    user_ids = count(1)
+
+    try:
+        await runner.measure(
+            "get_color (uncached)",
+            lambda: colors.get(server.avatar_url(next(user_ids))),
+            rounds=50,
+        )
+        await runner.measure(
+            "get_color (cached)",
+            lambda: colors.get(server.avatar_url(1)),
+            rounds=500,
+        )
+    finally:
+        await colors.close()
+        await server.close()
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from itertools import count
+
+from discord import app_commands
+
+ids = count(1000)
+
+
+class FakeAsset:
+    def __init__(self, url: str) -> None:
+        self.url = url
+
+
+class FakeUser:
+    def __init__(self, user_id: int = None, name: str = "user", avatar_url: str = ""):
+        self.id = user_id if user_id is not None else next(ids)
+        self.name = name
+        self.avatar = FakeAsset(avatar_url)
+        self.bot = False
+        self.mention = f"<@{self.id}>"
+
+
+class FakeAttachment:
+    def __init__(
+        self,
+        url: str,
+        filename: str = "image.png",
+        content_type: str = "image/png",
+        data: bytes = b"",
+    ) -> None:
+        self.id = next(ids)
+        self.url = url
+        self.filename = filename
+        self.content_type = content_type
+        self.data = data
+        self.size = len(data)
+
+    async def read(self) -> bytes:
+        return self.data
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int = None, api_latency: float = 0) -> None:
+        self.id = channel_id if channel_id is not None else next(ids)
+        # Simulated round trip for every Discord API call
+        self.api_latency = api_latency
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(self.api_latency)
+        message = FakeMessage(content, channel=self, **kwargs)
+        self.sent.append(message)
+        return message
+
+    @asynccontextmanager
+    async def typing(self):
+        yield
+
+
+class FakeMessage:
+    def __init__(
+        self,
+        content: str = "",
+        author: FakeUser = None,
+        channel: FakeChannel = None,
+        attachments: list = None,
+        **kwargs,
+    ) -> None:
+        self.id = next(ids)
+        self.content = content or ""
+        self.author = author or FakeUser()
+        self.channel = channel or FakeChannel()
+        self.attachments = attachments or []
+        self.embeds = [kwargs["embed"]] if kwargs.get("embed") else []
+        self.reference = None
+        self.created_at = datetime.now()
+        self.edited_at = None
+
+        self.reactions = set()
+        self.replies = []
+        self.edits = 0
+
+    async def reply(self, content=None, **kwargs):
+        await asyncio.sleep(self.channel.api_latency)
+        message = FakeMessage(content, channel=self.channel, **kwargs)
+        self.replies.append(message)
+        self.channel.sent.append(message)
+        return message
+
+    async def edit(self, **kwargs):
+        await asyncio.sleep(self.channel.api_latency)
+        self.edits += 1
+        self.edited_at = datetime.now()
+        if "content" in kwargs:
+            self.content = kwargs["content"] or ""
+        if "embed" in kwargs:
+            self.embeds = [kwargs["embed"]] if kwargs["embed"] else []
+        return self
+
+    async def add_reaction(self, emoji) -> None:
+        await asyncio.sleep(self.channel.api_latency)
+        self.reactions.add(emoji)
+
+    async def remove_reaction(self, emoji, member) -> None:
+        await asyncio.sleep(self.channel.api_latency)
+        self.reactions.discard(emoji)
+
+
+class FakeStats:
+    def __init__(self) -> None:
+        self.total = 0
+
+    def increment(self, amount: int = 1) -> None:
+        self.total += amount
+
+
+class FakeTree:
+    def __init__(self) -> None:
+        self.context_menus = []
+
+    def context_menu(self, name: str):
+        def decorator(callback):
+            menu = app_commands.ContextMenu(name=name, callback=callback)
+            self.context_menus.append(menu)
+            return menu
+
+        return decorator
+
+
+class FakeBot:
+    def __init__(self) -> None:
+        self.user = FakeUser(name="NebulaAI")
+        self.stats = FakeStats()
+        self.logger = logging.getLogger("NebulaAI")
+        self.tree = FakeTree()
+
+    async def is_owner(self, user) -> bool:
+        return False
@@ -0,0 +1,72 @@
+import asyncio
+import struct
+import zlib
+from pathlib import Path
+
+from aiohttp import web
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def make_png(width: int, height: int, color: tuple) -> bytes:
+    # A solid color image, enough for get_color without storing binary fixtures
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+        )
+
+    row = b"\x00" + bytes(color) * width
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * height))
+        + chunk(b"IEND", b"")
+    )
+
+
+class FixtureServer:
+    def __init__(self, latency: float = 0) -> None:
+        # Simulated network time for every response
+        self.latency = latency
+        self.runner = None
+        self.base_url = None
+
+    async def page(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        path = FIXTURES_DIR / f"{request.match_info['name']}.html"
+        if not path.is_file():
+            raise web.HTTPNotFound()
+        return web.Response(text=path.read_text(), content_type="text/html")
+
+    async def avatar(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        user_id = int(request.match_info["user_id"])
+        color = (user_id * 67 % 256, user_id * 131 % 256, user_id * 197 % 256)
+        return web.Response(body=make_png(16, 16, color), content_type="image/png")
+
+    def page_url(self, name: str) -> str:
+        return f"{self.base_url}pages/{name}"
+
+    def avatar_url(self, user_id: int) -> str:
+        return f"{self.base_url}avatars/{user_id}.png?size=1024"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_get("/pages/{name}", self.page)
+        app.router.add_get("/avatars/{user_id}.png", self.avatar)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+        host, port = self.runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}/"
+        return self.base_url
+
+    async def close(self) -> None:
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
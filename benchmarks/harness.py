@@ -0,0 +1,69 @@
+import asyncio
+import inspect
+import statistics
+from time import perf_counter
+
+
+async def call(function):
+    result = function()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def percentile(timings: list, fraction: float) -> float:
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class BenchmarkRunner:
+    def __init__(self) -> None:
+        # (name, timings in seconds, requests per second or None)
+        self.results = []
+
+    async def measure(self, name: str, function, rounds: int = 100, warmup: int = 3):
+        for _ in range(warmup):
+            await call(function)
+
+        timings = []
+        for _ in range(rounds):
+            before_time = perf_counter()
+            await call(function)
+            timings.append(perf_counter() - before_time)
+
+        self.results.append((name, timings, None))
+
+    async def throughput(
+        self, name: str, function, requests: int = 50, concurrency: int = 10
+    ):
+        # function gets the request number, at most `concurrency` run at once
+        semaphore = asyncio.Semaphore(concurrency)
+        timings = []
+
+        async def run(i):
+            async with semaphore:
+                before_time = perf_counter()
+                await call(lambda: function(i))
+                timings.append(perf_counter() - before_time)
+
+        before_time = perf_counter()
+        await asyncio.gather(*(run(i) for i in range(requests)))
+        elapsed = perf_counter() - before_time
+
+        self.results.append((name, timings, requests / elapsed))
+
+    def report(self) -> str:
+        header = f"{'benchmark':<48} {'rounds':>6} {'min':>10} {'median':>10} {'p95':>10} {'mean':>10} {'req/s':>8}"
+        lines = [header, "-" * len(header)]
+        for name, timings, rate in self.results:
+            columns = [
+                min(timings),
+                statistics.median(timings),
+                percentile(timings, 0.95),
+                statistics.fmean(timings),
+            ]
+            formatted = " ".join(f"{value * 1000:>8.3f}ms" for value in columns)
+            rate_string = f"{rate:>8.1f}" if rate else f"{'':>8}"
+            lines.append(f"{name:<48} {len(timings):>6} {formatted} {rate_string}")
+
+        return "\n".join(lines)
@@ -0,0 +1,134 @@
+import asyncio
+import json
+from time import time
+
+from aiohttp import web
+
+DEFAULT_REPLY = (
+    "Here is a short answer from the benchmark stub. It has enough words to be "
+    "streamed as a few dozen chunks, which is about what a quick chat reply looks "
+    "like when the model keeps it brief and to the point."
+)
+
+
+class OpenAIStub:
+    def __init__(
+        self,
+        latency: float = 0.05,
+        tokens_per_second: float = 200,
+        reply: str = DEFAULT_REPLY,
+        models: tuple = ("llama3.2:latest", "llava:latest"),
+    ) -> None:
+        # Time before the first token, then one "token" per word at this rate
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.reply = reply
+        self.models = models
+
+        self.requests = 0
+        self.runner = None
+
+    def tokens(self) -> list:
+        words = self.reply.split(" ")
+        return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+    def completion(self, model: str, content: str, tokens: int) -> dict:
+        return {
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": 0,
+                "completion_tokens": tokens,
+                "total_tokens": tokens,
+            },
+        }
+
+    def chunk(self, model: str, delta: dict, finish_reason=None, usage=None) -> bytes:
+        data = {
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time()),
+            "model": model,
+            "choices": (
+                [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+                if delta is not None
+                else []
+            ),
+            "usage": usage,
+        }
+        return f"data: {json.dumps(data)}\n\n".encode()
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        body = await request.json()
+        model = body["model"]
+        tokens = self.tokens()
+
+        await asyncio.sleep(self.latency)
+
+        if not body.get("stream"):
+            await asyncio.sleep(len(tokens) / self.tokens_per_second)
+            return web.json_response(
+                self.completion(model, "".join(tokens), len(tokens))
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for token in tokens:
+            await response.write(self.chunk(model, {"content": token}))
+            await asyncio.sleep(1 / self.tokens_per_second)
+        await response.write(self.chunk(model, {}, finish_reason="stop"))
+        if body.get("stream_options", {}).get("include_usage"):
+            usage = {
+                "prompt_tokens": 0,
+                "completion_tokens": len(tokens),
+                "total_tokens": len(tokens),
+            }
+            await response.write(self.chunk(model, None, usage=usage))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def tags(self, request: web.Request) -> web.Response:
+        return web.json_response({"models": [{"name": name} for name in self.models]})
+
+    async def ps(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "models": [
+                    {"name": name, "size_vram": 0, "expires_at": ""}
+                    for name in self.models
+                ]
+            }
+        )
+
+    async def generate(self, request: web.Request) -> web.Response:
+        return web.json_response({"done": True, "load_duration": 0})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/api/tags", self.tags)
+        app.router.add_get("/api/ps", self.ps)
+        app.router.add_post("/api/generate", self.generate)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+        host, port = self.runner.addresses[0][:2]
+        return f"http://{host}:{port}/v1/"
+
+    async def close(self) -> None:
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
@@ -1,16 +1,15 @@
 import asyncio
+from copy import deepcopy
 from datetime import datetime
+from hashlib import sha256
 from io import BytesIO
 from json import dumps
 from random import choice
-from tempfile import NamedTemporaryFile
 from time import time
 from traceback import format_exc
 from typing import List
 
-import asyncssh
 import discord
-import whisper
 from aiohttp import ClientSession
 from aiohttp_socks import ProxyConnector
 from discord import (
@@ -24,7 +23,6 @@ from discord import (
 )
 from discord.ext import commands
 from discord.ext.commands import Context
-from openai import AsyncOpenAI
 
 from plugins import (
     ImageGenPlugin,
@@ -35,10 +33,32 @@ from plugins import (
     WebPlugin,
     YouTubePlugin,
 )
-from utils.colorthief import get_color
+from utils.backends import BackendPool
+from utils.cache import ResponseCache, make_key, normalize
+from utils.colorthief import colors, get_color
+from utils.compactor import ContextCompactor
+from utils.config import configs
 from utils.container import PythonContainer
+from utils.context import ContextStore, count_tokens, system_messages
 from utils.context_commands import add_context_commands
-from utils.jsons import AIConfigJSON, ConfigJSON
+from utils.database import CacheDatabase, ContextDatabase
+from utils.metrics import (
+    errors_total,
+    plugin_process_seconds,
+    queue_depth,
+)
+from utils.residency import ModelResidency
+from utils.router import PluginRouter, format_timings
+from utils.scheduler import RequestScheduler
+from utils.singleflight import CoalescingClient
+from utils.startup import lazy_import_async
+from utils.status import status
+from utils.tracing import format_trace, trace, tracer
+from utils.transcription import (
+    TranscriptionQueueFull,
+    TranscriptionService,
+    decode_audio,
+)
 
 
 class CodeSelectMenu(ui.Select):
@@ -70,11 +90,11 @@ class CodeSelectMenu(ui.Select):
                 loading_embed.description = (
                     "<a:loading:1292980861142040606> Writing script to container..."
                 )
-                await loading_message.edit(embed=loading_embed)
+                status.update(loading_message, embed=loading_embed)
                 await container.write_file_in_container(container_id, selected_script)
 
                 loading_embed.description = f"<a:loading:1292980861142040606> Running script {selected_index + 1}..."
-                await loading_message.edit(embed=loading_embed)
+                status.update(loading_message, embed=loading_embed)
                 result = await container.run_python_file(container_id)
 
                 embed = discord.Embed(
@@ -93,21 +113,22 @@ class CodeSelectMenu(ui.Select):
                 output = result["output"] + result["error"]
                 if len(output) > 4096:
                     file = discord.File(BytesIO(output.encode()), filename="output.txt")
-                    await loading_message.edit(embed=embed, attachments=[file])
+                    await status.flush(loading_message, embed=embed, attachments=[file])
                 else:
                     embed.description = f"```\n{output}\n```"
-                    await loading_message.edit(embed=embed)
+                    await status.flush(loading_message, embed=embed)
 
             finally:
                 await container.force_stop_container(container_id)
 
         except Exception as e:
+            errors_total.inc(stage="run_code")
             embed = discord.Embed(
                 title="Error",
                 description=f"An error occurred while running the script: {str(e)}",
                 color=discord.Color.red(),
             )
-            await loading_message.edit(embed=embed)
+            await status.flush(loading_message, embed=embed)
 
 
 class RunCodeButton(ui.Button):
@@ -131,57 +152,114 @@ class RunCodeButton(ui.Button):
 
 
 class AI(commands.Cog, name="ai"):
-    def __init__(self, bot) -> None:
+    def __init__(
+        self, bot, config=None, ai_config=None, proxies=None, plugins=None
+    ) -> None:
+        # The config files are only read for what isn't passed in
         self.bot = bot
         self.bot.allowed_mentions = discord.AllowedMentions.none()
 
-        self.config = ConfigJSON().load_json()
-        self.ai_config = AIConfigJSON().load_json()
+        self.config = (
+            config if config is not None else configs.json("config/config.json")
+        )
+        self.ai_config = (
+            ai_config if ai_config is not None else configs.json("config/ai.json")
+        )
 
-        self.proxies = self.load_proxies()
+        self.proxies = proxies if proxies is not None else self.load_proxies()
+        status.interval = self.ai_config.get("status", {}).get("interval", 1.0)
+        colors.configure(self.ai_config.get("colors", {}))
 
-        self.client = AsyncOpenAI(
-            base_url=self.ai_config["base_url"], api_key=self.ai_config["api_key"]
-        )
         self.session = ClientSession()
+        self.pool = BackendPool(
+            self.ai_config["base_url"],
+            self.ai_config["api_key"],
+            self.session,
+            self.ai_config.get("backend_probe_interval", 30),
+        )
+        self.client = CoalescingClient(self.pool)
+        self.residency = ModelResidency(
+            self.pool,
+            self.session,
+            self.ai_config,
+            self.ai_config.get("residency", {}),
+        )
         if self.proxies == []:
             self.session_proxied = self.session
         else:
             self.session_proxied = ClientSession(
                 connector=ProxyConnector.from_url(choice(self.proxies))
             )
-        self.context = {}
-        self.whisper_model = whisper.load_model("base")
+        context_config = self.ai_config.get("context", {})
+        database_path = context_config.get("database", "config/context.db")
+        self.context = ContextStore(
+            context_config, ContextDatabase(database_path) if database_path else None
+        )
+        self.transcription = TranscriptionService(
+            self.ai_config.get("transcription", {})
+        )
         self.ssh_connection = None
 
-        self.blacklist_ids = self.ai_config["blacklist"]
-        self.system_prompt = [
-            {
-                "role": "system",
-                "content": self.ai_config["system_prompt"].replace(
-                    "{date}", datetime.utcnow().strftime("%Y-%m-%d")
-                ),
-            }
-        ]
         self.owner_only_mode = False
 
-        self.plugins = [
-            ImagesPlugin(self.session),
-            # RedditPlugin(
-            #    self.config["reddit"]["id"], self.config["reddit"]["secret"], "NebulaAI"
-            # ),
-            # YouTubePlugin(self.session, self.whisper_model),
-            # ImageGenPlugin(self.session, self.client, self.ai_config),
-            # ShellPlugin(self.session, self.client, self.ai_config),
-            WebPlugin(self.session_proxied, self.client, self.ai_config, self.proxies),
-        ]
+        if plugins is None:
+            plugins = [
+                ImagesPlugin(self.session),
+                # RedditPlugin(
+                #    self.config["reddit"]["id"], self.config["reddit"]["secret"], "NebulaAI"
+                # ),
+                # YouTubePlugin(self.session, self.transcription),
+                # ImageGenPlugin(self.session, self.client, self.ai_config),
+                # ShellPlugin(self.session, self.client, self.ai_config),
+                WebPlugin(
+                    self.session_proxied, self.client, self.ai_config, self.proxies
+                ),
+            ]
+        self.plugins = plugins
+        self.router = PluginRouter(self.plugins)
+        self.scheduler = RequestScheduler(
+            self.ai_config.get("scheduler", {}).get("max_concurrent", 2)
+        )
+        queue_depth.set_function(lambda: self.scheduler.running, state="running")
+        queue_depth.set_function(lambda: self.scheduler.waiting, state="waiting")
+        self.compactor = ContextCompactor(
+            self.context,
+            self.client,
+            self.scheduler,
+            self.ai_config,
+            context_config.get("compaction", {}),
+        )
+
+        cache_config = self.ai_config.get("response_cache", {})
+        cache_database_path = cache_config.get("database", "config/cache.db")
+        self.response_cache = ResponseCache(
+            cache_config.get("max_entries", 1024),
+            cache_config.get("ttl", 86400),
+            CacheDatabase(cache_database_path) if cache_database_path else None,
+        )
 
-        add_context_commands(self.bot, self.client, self.ai_config)
+        add_context_commands(
+            self.bot, self.client, self.ai_config, self.scheduler, self.response_cache
+        )
+
+    async def cog_load(self):
+        await self.pool.start()
+        await self.residency.start()
+        await self.context.start()
+        self.transcription.start()
 
     async def cog_unload(self):
         for plugin in self.plugins:
             await plugin.plugin_unload()
 
+        await self.compactor.close()
+        await self.context.close()
+        self.response_cache.close()
+        await colors.close()
+
+        await self.transcription.close()
+        await self.residency.close()
+        await self.pool.close()
         await self.session.close()
         await self.session_proxied.close()
 
@@ -199,10 +277,15 @@ class AI(commands.Cog, name="ai"):
             return []
 
     def increment_requests(self):
-        self.ai_config["total_requests"] = self.ai_config["total_requests"] + 1
-        AIConfigJSON().write_json(self.ai_config)
+        self.bot.stats.increment()
 
     async def handle_gpt(self, message: discord.Message, content: str = None):
+        with trace("handle_gpt", user=message.author.id), self.context.pin(
+            message.author.id
+        ):
+            return await self.respond(message, content)
+
+    async def respond(self, message: discord.Message, content: str = None):
         content = message.content.lstrip(";") if content is None else content
         loading_emoji = "<a:loading:1292980861142040606>"
         await message.add_reaction(loading_emoji)
@@ -210,11 +293,6 @@ class AI(commands.Cog, name="ai"):
         try:
             initial_message = None
             used_plugin = None
-            user_context = self.context.get(message.author.id, [])
-            try:
-                recent_context = user_context[-4:]
-            except:
-                recent_context = user_context
 
             embed = Embed(
                 description="<a:loading:1292980861142040606> AI is typing a response...",
@@ -222,12 +300,31 @@ class AI(commands.Cog, name="ai"):
             )
             initial_message = await message.reply(embed=embed)
 
-            for plugin in self.plugins:
-                plugin_result = await plugin.process(
-                    initial_message, message, content, recent_context
-                )
-                if plugin_result:
-                    if plugin.normal_takeover:
+            async def show_position(position):
+                await self.show_queue_position(initial_message, position)
+
+            async with self.scheduler.slot(
+                message.author.id, on_position=show_position
+            ):
+                await self.context.load(message.author.id)
+                recent_context = self.context.get(message.author.id)[-4:]
+
+                routing = self.router.route(message, content)
+                used_plugin, confidence = await routing.next()
+
+                prompt = None
+                while used_plugin:
+                    with plugin_process_seconds.time(
+                        plugin=used_plugin.name
+                    ), tracer.span("process", plugin=used_plugin.name):
+                        plugin_result = await used_plugin.process(
+                            initial_message,
+                            message,
+                            content,
+                            recent_context,
+                            confidence,
+                        )
+                    if plugin_result and used_plugin.normal_takeover:
                         self.increment_requests()
 
                         try:
@@ -236,61 +333,93 @@ class AI(commands.Cog, name="ai"):
                             pass
 
                         return
-                    else:
-                        try:
-                            prompt, confidence = plugin_result
-                        except:
-                            prompt = plugin_result
-                            confidence = None
+                    elif plugin_result:
+                        prompt = plugin_result
+                        break
 
-                        used_plugin = plugin
+                    # Nothing from this plugin, the next eligible one gets its turn
+                    used_plugin, confidence = await routing.next()
 
-                        break
-            else:
-                prompt = [
-                    {"role": "user", "content": [{"type": "text", "text": content}]},
-                ]
-                confidence = None
+                routing_string = format_timings(routing.timings)
 
-            if message.author.id in self.context:
-                full_prompt = (
-                    self.system_prompt + self.context[message.author.id] + prompt
+                if prompt is None:
+                    prompt = [
+                        {
+                            "role": "user",
+                            "content": [{"type": "text", "text": content}],
+                        },
+                    ]
+
+                model = (
+                    self.ai_config["models"]["vision"]
+                    if message.attachments
+                    else self.ai_config["models"]["text"]
                 )
-            else:
-                full_prompt = self.system_prompt + prompt
 
-            model = (
-                self.ai_config["models"]["vision"]
-                if message.attachments
-                else self.ai_config["models"]["text"]
-            )
+                system_prompt, system_suffix = system_messages(
+                    self.ai_config["system_prompt"]
+                )
+                budget = (
+                    self.context.get_budget(model)
+                    - self.context.reply_tokens
+                    - sum(
+                        count_tokens(msg)
+                        for msg in system_prompt + prompt + system_suffix
+                    )
+                )
+                full_prompt = (
+                    system_prompt
+                    + self.context.window(message.author.id, budget)
+                    + prompt
+                    + system_suffix
+                )
 
-            before_time = time()
-            completion = await self.client.chat.completions.create(
-                model=model,
-                messages=full_prompt,
-            )
-            processed_time = round(time() - before_time, 3)
-            token_amount = completion.usage.completion_tokens
-            tps = round(token_amount / processed_time, 1)
-            tps_string = (
-                f"time {processed_time}s, {token_amount} tokens, {tps} tokens/s"
-            )
+                if self.ai_config.get("streaming", {}).get("enabled", False):
+                    response, messages, tps_string = await self.stream_response(
+                        message,
+                        model,
+                        full_prompt,
+                        initial_message,
+                        used_plugin,
+                        confidence,
+                        routing_string,
+                    )
+                else:
+                    cold = not self.residency.is_loaded(model)
+                    before_time = time()
+                    with tracer.span("completion", model=model):
+                        completion = await self.client.chat.completions.create(
+                            model=model,
+                            messages=full_prompt,
+                            user=str(message.author.id),
+                        )
+                    processed_time = round(time() - before_time, 3)
+                    self.residency.record(model, cold, processed_time, "completion")
+                    token_amount = completion.usage.completion_tokens
+                    tps = round(token_amount / processed_time, 1)
+                    tps_string = (
+                        f"time {processed_time}s, {token_amount} tokens, {tps} tokens/s"
+                    )
 
-            response = completion.choices[0].message.content
+                    response = completion.choices[0].message.content
 
-            if message.author.id in self.context:
-                self.context[message.author.id].append(prompt[0])
-            else:
-                self.context[message.author.id] = prompt
+                    _, messages, _ = await self.send_response(
+                        message,
+                        response,
+                        tps_string,
+                        initial_message,
+                        used_plugin,
+                        confidence,
+                        routing_string,
+                    )
 
-            self.context[message.author.id].append(
-                {"role": "assistant", "content": response}
-            )
+                self.context.append(
+                    message.author.id,
+                    prompt[0],
+                    {"role": "assistant", "content": response},
+                )
+                self.compactor.schedule(message.author.id)
 
-            _, messages, _ = await self.send_response(
-                message, response, tps_string, initial_message, used_plugin, confidence
-            )
             self.increment_requests()
 
             try:
@@ -301,10 +430,11 @@ class AI(commands.Cog, name="ai"):
             return response, messages, tps_string
         except Exception as e:
             print(format_exc())
+            errors_total.inc(stage="chat")
 
             embed = Embed(description=str(e), color=Color.red())
             if initial_message:
-                await initial_message.edit(embed=embed)
+                await status.flush(initial_message, embed=embed)
             else:
                 await message.reply(embed=embed)
 
@@ -312,6 +442,20 @@ class AI(commands.Cog, name="ai"):
 
             return None, None, None
 
+    async def show_queue_position(self, initial_message, position: int):
+        if position == 0:
+            description = "AI is typing a response..."
+        else:
+            description = f"Waiting in queue (position {position})..."
+
+        status.update(
+            initial_message,
+            embed=Embed(
+                description=f"<a:loading:1292980861142040606> {description}",
+                color=Color.blue(),
+            ),
+        )
+
     async def send_response(
         self,
         message,
@@ -320,21 +464,16 @@ class AI(commands.Cog, name="ai"):
         initial_message=None,
         used_plugin=None,
         confidence: float = None,
+        routing_string: str = None,
     ):
         messages = []
-        code_blocks = []
-
-        parts = response.split("```")
-        for i in range(1, len(parts), 2):
-            if parts[i].startswith("python"):
-                code_blocks.append(parts[i][6:].strip())
 
         for i in range(0, len(response), 2000):
             chunk = response[i : i + 2000]
             if messages:
                 msg = await messages[-1].reply(chunk)
             elif initial_message:
-                await initial_message.edit(content=chunk, embed=None)
+                await status.flush(initial_message, content=chunk, embed=None)
                 msg = initial_message
             else:
                 try:
@@ -347,13 +486,123 @@ class AI(commands.Cog, name="ai"):
                     msg = await message.channel.send(chunk, embed=embed)
             messages.append(msg)
 
+        await self.finish_response(
+            message,
+            response,
+            messages,
+            tps_string,
+            used_plugin,
+            confidence,
+            routing_string,
+        )
+
+        return response, messages, tps_string
+
+    async def stream_response(
+        self,
+        message,
+        model: str,
+        full_prompt: list,
+        initial_message,
+        used_plugin=None,
+        confidence: float = None,
+        routing_string: str = None,
+    ):
+        edit_interval = self.ai_config.get("streaming", {}).get("edit_interval", 1.5)
+        messages = [initial_message]
+        response = ""
+        # Index in the response where the text of messages[-1] starts
+        offset = 0
+        last_edit = 0
+        ttft = None
+        token_amount = 0
+        usage = None
+
+        cold = not self.residency.is_loaded(model)
+        before_time = time()
+        with tracer.span("completion", model=model, stream=True):
+            stream = await self.client.chat.completions.create(
+                model=model,
+                messages=full_prompt,
+                user=str(message.author.id),
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+
+                if ttft is None:
+                    ttft = round(time() - before_time, 3)
+                    self.residency.record(model, cold, ttft, "ttft")
+                token_amount += 1
+                response += chunk.choices[0].delta.content
+
+                # Roll over into a new message once the current one is full
+                while len(response) - offset > 2000:
+                    await status.flush(
+                        messages[-1],
+                        content=response[offset : offset + 2000],
+                        embed=None,
+                    )
+                    offset += 2000
+                    messages.append(
+                        await messages[-1].reply(response[offset : offset + 2000])
+                    )
+                    last_edit = time()
+
+                if time() - last_edit >= edit_interval:
+                    status.update(messages[-1], content=response[offset:], embed=None)
+                    last_edit = time()
+
+        processed_time = round(time() - before_time, 3)
+        if usage:
+            token_amount = usage.completion_tokens
+        tps = round(token_amount / processed_time, 1)
+        tps_string = f"ttft {ttft}s, time {processed_time}s, {token_amount} tokens, {tps} tokens/s"
+
+        if response[offset:]:
+            await status.flush(messages[-1], content=response[offset:], embed=None)
+
+        await self.finish_response(
+            message,
+            response,
+            messages,
+            tps_string,
+            used_plugin,
+            confidence,
+            routing_string,
+        )
+
+        return response, messages, tps_string
+
+    async def finish_response(
+        self,
+        message,
+        response,
+        messages: list,
+        tps_string: str,
+        used_plugin=None,
+        confidence: float = None,
+        routing_string: str = None,
+    ):
+        code_blocks = []
+
+        parts = response.split("```")
+        for i in range(1, len(parts), 2):
+            if parts[i].startswith("python"):
+                code_blocks.append(parts[i][6:].strip())
+
         plugin_info = (
             f"Used plugin: {used_plugin.name}{f' ({confidence} confidence) ' if confidence else ''}\n\n"
             if used_plugin
             else ""
         )
+        routing_info = f"\n{routing_string}" if routing_string else ""
         embed = Embed(
-            description=f"{plugin_info}{tps_string}",
+            description=f"{plugin_info}{tps_string}{routing_info}",
             color=await get_color(message.author.avatar.url),
             timestamp=datetime.now(),
         )
@@ -366,14 +615,13 @@ class AI(commands.Cog, name="ai"):
             view = ui.View()
             connection = await self.get_ssh_connection()
             view.add_item(RunCodeButton(code_blocks, connection))
-            await messages[-1].edit(embed=embed, view=view)
+            await status.flush(messages[-1], embed=embed, view=view)
         else:
-            await messages[-1].edit(embed=embed)
-
-        return response, messages, tps_string
+            await status.flush(messages[-1], embed=embed)
 
     async def get_ssh_connection(self):
         if not self.ssh_connection or self.ssh_connection.is_closed():
+            asyncssh = await lazy_import_async("asyncssh")
             private_key = asyncssh.read_private_key("config/docker.pem")
             self.ssh_connection = await asyncssh.connect(
                 self.ai_config["container_host"]["ip"],
@@ -387,7 +635,7 @@ class AI(commands.Cog, name="ai"):
         if not message.guild or message.author.bot:
             return
 
-        if message.author.id in self.blacklist_ids:
+        if message.author.id in self.ai_config["blacklist"]:
             return
 
         if self.owner_only_mode and not await self.bot.is_owner(message.author):
@@ -395,46 +643,85 @@ class AI(commands.Cog, name="ai"):
 
         if message.attachments:
             if message.attachments[0].filename == "voice-message.ogg":
-                with NamedTemporaryFile() as temp:
-                    resp = await self.session.get(message.attachments[0].url)
-                    temp.write(await resp.read())
+                async with self.session.get(message.attachments[0].url) as resp:
+                    resp.raise_for_status()
+                    content = await resp.read()
+
+                # Forwarded copies of a voice message share a transcript and skip the decode
+                key = self.transcription.cache_key("voice", sha256(content).hexdigest())
+                result = await self.transcription.cached(key)
+
+                queue_message = None
+                queue_lock = asyncio.Lock()
+
+                async def on_position(position: int):
+                    nonlocal queue_message
+                    # Only say anything when the voice message has to wait
+                    async with queue_lock:
+                        if not position and not queue_message:
+                            return
+                        embed = discord.Embed(
+                            description=(
+                                f"Waiting to transcribe (position {position})..."
+                                if position
+                                else "Transcribing..."
+                            ),
+                            color=await get_color(message.author.avatar.url),
+                        )
+                        if queue_message:
+                            status.update(queue_message, embed=embed)
+                        else:
+                            queue_message = await message.reply(embed=embed)
 
-                    loop = asyncio.get_event_loop()
-                    result = await loop.run_in_executor(
-                        None, lambda: self.whisper_model.transcribe(temp.name)
+                try:
+                    if result is None:
+                        with tracer.span("decode"):
+                            audio = await decode_audio(content)
+                        result = await self.transcription.transcribe(
+                            audio, TranscriptionService.VOICE, on_position, key
+                        )
+                except TranscriptionQueueFull:
+                    embed = discord.Embed(
+                        title="Error",
+                        description="Too many voice messages are waiting to be transcribed, try again later.",
+                        color=Color.red(),
                     )
+                    await message.reply(embed=embed)
+                    return
+                finally:
+                    if queue_message:
+                        status.cancel(queue_message)
+                        await queue_message.delete()
 
-                    if result["text"] == "":
-                        return
+                if result["text"] == "":
+                    return
 
-                    embed = discord.Embed(
-                        title="Transcribed Text",
-                        description=result["text"].lstrip(" "),
-                        color=await get_color(message.author.avatar.url),
-                    )
-                    embed.set_footer(
-                        text=f"Voice message from {message.author.name}",
-                        icon_url=message.author.avatar.url,
-                    )
-                    embed.timestamp = datetime.now()
+                embed = discord.Embed(
+                    title="Transcribed Text",
+                    description=result["text"].lstrip(" "),
+                    color=await get_color(message.author.avatar.url),
+                )
+                embed.set_footer(
+                    text=f"Voice message from {message.author.name}",
+                    icon_url=message.author.avatar.url,
+                )
+                embed.timestamp = datetime.now()
 
-                    if message.channel.id == self.config["gpt_channel"]:
-                        async with message.channel.typing():
-                            _, msgs, tps = await self.handle_gpt(
-                                message, content=result["text"]
-                            )
+                if message.channel.id == self.config["gpt_channel"]:
+                    async with message.channel.typing():
+                        _, msgs, tps = await self.handle_gpt(
+                            message, content=result["text"]
+                        )
 
-                            embed.add_field(
-                                name="AI Statistics", value=tps, inline=False
-                            )
+                        embed.add_field(name="AI Statistics", value=tps, inline=False)
 
-                            await msgs[-1].edit(embed=embed)
-                    else:
-                        await message.reply(embed=embed)
+                        await status.flush(msgs[-1], embed=embed)
+                else:
+                    await message.reply(embed=embed)
 
-                    self.increment_requests()
+                self.increment_requests()
 
-                    return
+                return
 
         if message.channel.id != self.config[
             "gpt_channel"
@@ -451,7 +738,7 @@ class AI(commands.Cog, name="ai"):
     async def convert(self, context: Context, units: str):
         await context.defer()
 
-        if context.author.id in self.blacklist_ids:
+        if context.author.id in self.ai_config["blacklist"]:
             embed = discord.Embed(
                 description="You are blacklisted from the AI features of this bot.",
                 color=discord.Color.red(),
@@ -468,25 +755,40 @@ class AI(commands.Cog, name="ai"):
             return
 
         try:
-            prompt = [
-                {"role": "user", "content": [{"type": "text", "text": units}]},
-            ]
+            model = self.ai_config["models"]["text"]
+            convert_prompt = configs.text("config/prompts/_general/convert.md")
+            cache_key = make_key(
+                "convert", model, convert_prompt.digest, normalize(units)
+            )
+            response = await self.response_cache.get(cache_key)
+            cache_hit = response is not None
+
+            if cache_hit:
+                # Answering from the cache costs nothing, don't hold the cooldown
+                context.command.reset_cooldown(context)
+            else:
+                prompt = [
+                    {"role": "user", "content": [{"type": "text", "text": units}]},
+                ]
 
-            with open("config/prompts/_general/convert.md", "r") as f:
                 system_prompt = [
                     {
                         "role": "system",
-                        "content": f.read().strip(),
+                        "content": convert_prompt.data,
                     }
                 ]
                 full_prompt = system_prompt + prompt
 
-            completion = await self.client.chat.completions.create(
-                model=self.ai_config["models"]["text"],
-                messages=full_prompt,
-            )
+                async with self.scheduler.slot(
+                    context.author.id, RequestScheduler.INTERACTIVE
+                ):
+                    completion = await self.client.chat.completions.create(
+                        model=model,
+                        messages=full_prompt,
+                    )
 
-            response = completion.choices[0].message.content
+                response = completion.choices[0].message.content
+                await self.response_cache.set(cache_key, response)
 
             self.increment_requests()
 
@@ -497,12 +799,13 @@ class AI(commands.Cog, name="ai"):
                 timestamp=datetime.now(),
             )
             embed.set_footer(
-                text=f"Request from {context.author.name}",
+                text=f"Request from {context.author.name} • {self.response_cache.format_stats(cache_hit)}",
                 icon_url=context.author.avatar.url,
             )
             await context.send(embed=embed)
         except Exception as e:
             print(format_exc())
+            errors_total.inc(stage="convert")
 
             embed = Embed(description=str(e), color=Color.red())
             await context.send(embed=embed)
@@ -511,6 +814,7 @@ class AI(commands.Cog, name="ai"):
         name="ai", description="Reset your context", fallback="reset"
     )
     async def ai(self, context: Context):
+        await self.context.load(context.author.id)
         if context.author.id not in self.context:
             embed = discord.Embed(
                 description="You don't have a context stored.",
@@ -518,7 +822,7 @@ class AI(commands.Cog, name="ai"):
             )
             await context.send(embed=embed)
         else:
-            del self.context[context.author.id]
+            self.context.clear(context.author.id)
             embed = discord.Embed(
                 description="Cleared your stored context.", color=discord.Color.green()
             )
@@ -527,7 +831,7 @@ class AI(commands.Cog, name="ai"):
     @commands.is_owner()
     @ai.command(description="Reset everyone's context")
     async def resetall(self, context: Context):
-        self.context.clear()
+        self.context.clear_all()
         embed = discord.Embed(
             description="Cleared everyone's stored context.",
             color=discord.Color.green(),
@@ -536,19 +840,16 @@ class AI(commands.Cog, name="ai"):
 
     @ai.command(description="Get the current system prompt")
     async def get_prompt(self, context: Context):
-        prompt = self.system_prompt[0]["content"]
-        await context.send(prompt)
+        await context.send(self.ai_config["system_prompt"])
 
     @commands.is_owner()
     @ai.command(description="Set the system prompt")
     @app_commands.describe(prompt="Text to set the system prompt to")
     async def set_prompt(self, context: Context, prompt: str):
-        old_prompt = self.system_prompt[0]["content"]
-        self.system_prompt[0]["content"] = prompt
-        self.ai_config["system_prompt"] = prompt
-        AIConfigJSON().write_json(self.ai_config)
+        old_prompt = self.ai_config["system_prompt"]
+        await self.ai_config.update(lambda data: data.update(system_prompt=prompt))
 
-        self.context.clear()
+        self.context.clear_all()
 
         embed = discord.Embed(
             description="Updated the system prompt and cleared everyone's stored context.",
@@ -577,19 +878,13 @@ class AI(commands.Cog, name="ai"):
     async def models_autocompletion(
         self, interaction: Interaction, current: str
     ) -> List[app_commands.Choice[str]]:
-        models = []
-        tags = await self.session.get(
-            f"{str(self.client.base_url).replace('v1/', '')}api/tags"
-        )
-        j = await tags.json()
-        for model in j["models"]:
-            models.append(model["name"])
+        models = self.pool.models()
 
         return [
             app_commands.Choice(name=choice, value=choice)
             for choice in models
             if current.lower() in choice.lower()
-        ]
+        ][:25]
 
     @commands.is_owner()
     @ai.command(description="Set the model")
@@ -601,9 +896,12 @@ class AI(commands.Cog, name="ai"):
         old_text = self.ai_config["models"]["text"]
         old_vision = self.ai_config["models"]["vision"]
 
-        self.ai_config["models"]["text"] = text_model
-        self.ai_config["models"]["vision"] = vision_model
-        AIConfigJSON().write_json(self.ai_config)
+        def update_models(data):
+            data["models"]["text"] = text_model
+            data["models"]["vision"] = vision_model
+
+        await self.ai_config.update(update_models)
+        self.residency.schedule_warm()
 
         embed = discord.Embed(
             title="Updated Models",
@@ -620,19 +918,74 @@ class AI(commands.Cog, name="ai"):
 
         await context.send(embed=embed)
 
+    @commands.is_owner()
+    @ai.command(description="Show which models are loaded on each backend")
+    async def loaded_models(self, context: Context):
+        await self.residency.refresh_all()
+
+        status = (
+            "active hours" if self.residency.is_active() else "outside active hours"
+        )
+        embed = discord.Embed(
+            title="Loaded Models",
+            description=f"Keeping {', '.join(self.residency.models())} loaded ({status})",
+            color=discord.Color.green(),
+        )
+        for backend in self.pool.backends:
+            lines = []
+            for name, model in self.residency.loaded.get(backend.url, {}).items():
+                vram = round(model.get("size_vram", 0) / 1024**3, 1)
+                expires = model.get("expires_at", "?")[:19]
+                lines.append(f"{name} ({vram} GB VRAM, expires {expires})")
+            embed.add_field(
+                name=backend.url,
+                value="\n".join(lines) or "Nothing loaded",
+                inline=False,
+            )
+
+        embed.add_field(
+            name="Latency to first token (streamed)",
+            value=f"{self.residency.format_latency('ttft', 'cold')}\n{self.residency.format_latency('ttft', 'warm')}",
+            inline=False,
+        )
+        embed.add_field(
+            name="Completion time (not streamed)",
+            value=f"{self.residency.format_latency('completion', 'cold')}\n{self.residency.format_latency('completion', 'warm')}",
+            inline=False,
+        )
+        load_times = [
+            f"{model}: {seconds}s"
+            for model, seconds in self.residency.load_times.items()
+        ]
+        if load_times:
+            embed.add_field(
+                name="Last load times", value="\n".join(load_times), inline=False
+            )
+
+        await context.send(embed=embed)
+
     @commands.is_owner()
     @ai.command(description="Get the current ollama base URL")
     async def get_base_url(self, context: Context):
-        await context.send(str(self.client.base_url), ephemeral=True)
+        lines = []
+        for backend in self.pool.backends:
+            status = "healthy" if backend.healthy else "unhealthy"
+            lines.append(f"{backend.url} ({status}, {backend.in_flight} in flight)")
+        await context.send("\n".join(lines), ephemeral=True)
 
     @commands.is_owner()
     @ai.command(description="Set the ollama base URL")
-    @app_commands.describe(url="New ollama base URL (ending with v1/)")
+    @app_commands.describe(
+        url="New ollama base URL (ending with v1/), separate multiple backends with commas"
+    )
     async def set_base_url(self, context: Context, url: str):
-        old_url = str(self.client.base_url)
-        self.ai_config["base_url"] = url
-        AIConfigJSON().write_json(self.ai_config)
-        self.client.base_url = url
+        old_url = self.pool.base_url
+        urls = [part.strip() for part in url.split(",") if part.strip()]
+        base_url = urls[0] if len(urls) == 1 else urls
+        await self.ai_config.update(lambda data: data.update(base_url=base_url))
+        self.pool.set_backends(base_url)
+        await self.pool.probe_all()
+        self.residency.schedule_warm()
 
         embed = discord.Embed(
             title="Base URL change",
@@ -647,7 +1000,7 @@ class AI(commands.Cog, name="ai"):
     @ai.command(description="Blacklist a user from AI features")
     @app_commands.describe(user="User to blacklist")
     async def blacklist(self, context: Context, user: discord.Member):
-        if user.id in self.blacklist_ids:
+        if user.id in self.ai_config["blacklist"]:
             embed = discord.Embed(
                 description=f"{user.mention} ({user.id}) is already in the AI blacklist",
                 color=discord.Color.red(),
@@ -655,8 +1008,7 @@ class AI(commands.Cog, name="ai"):
             await context.send(embed=embed)
             return
 
-        self.blacklist_ids.append(user.id)
-        AIConfigJSON().write_json(self.ai_config)
+        await self.ai_config.update(lambda data: data["blacklist"].append(user.id))
 
         embed = discord.Embed(
             title="Blacklist updated",
@@ -670,7 +1022,7 @@ class AI(commands.Cog, name="ai"):
     @ai.command(description="Unblacklist a user from AI features")
     @app_commands.describe(user="User to unblacklist")
     async def unblacklist(self, context: Context, user: discord.Member):
-        if user.id not in self.blacklist_ids:
+        if user.id not in self.ai_config["blacklist"]:
             embed = discord.Embed(
                 description=f"{user.mention} ({user.id}) is not in the AI blacklist",
                 color=discord.Color.red(),
@@ -678,9 +1030,7 @@ class AI(commands.Cog, name="ai"):
             await context.send(embed=embed)
             return
 
-        self.ai_config["blacklist"].remove(user.id)
-        AIConfigJSON().write_json(self.ai_config)
-        self.blacklist_ids.remove(user.id)
+        await self.ai_config.update(lambda data: data["blacklist"].remove(user.id))
 
         embed = discord.Embed(
             title="Blacklist updated",
@@ -704,7 +1054,10 @@ class AI(commands.Cog, name="ai"):
                 return
 
         try:
-            user_context = self.context[target_user.id].copy()
+            await self.context.load(target_user.id)
+            if target_user.id not in self.context:
+                raise KeyError(target_user.id)
+            user_context = deepcopy(self.context.get(target_user.id))
 
             for message in user_context:
                 if isinstance(message.get("content"), list):
@@ -740,6 +1093,7 @@ class AI(commands.Cog, name="ai"):
     @ai.command(description="Docker testing")
     async def docker(self, context: Context):
         await context.defer()
+        asyncssh = await lazy_import_async("asyncssh")
         try:
             private_key = asyncssh.read_private_key("config/docker.pem")
             async with asyncssh.connect(
@@ -778,6 +1132,69 @@ class AI(commands.Cog, name="ai"):
         )
         await context.send(embed=embed)
 
+    @commands.is_owner()
+    @ai.command(description="Get performance statistics")
+    async def stats(self, context: Context):
+        embed = discord.Embed(
+            title="AI Statistics",
+            color=discord.Color.green(),
+        )
+        embed.add_field(
+            name="Requests",
+            value=f"{self.bot.stats.total} total\n{self.scheduler.running} running, {self.scheduler.waiting} waiting",
+            inline=False,
+        )
+        embed.add_field(
+            name="Request coalescing",
+            value=f"{self.client.hits} hits, {self.client.misses} misses\n{len(self.client.in_flight)} in flight",
+            inline=False,
+        )
+        embed.add_field(
+            name="Response cache",
+            value=f"{self.response_cache.hits} hits, {self.response_cache.misses} misses\n{len(self.response_cache.entries)} entries in memory",
+            inline=False,
+        )
+        embed.add_field(
+            name="Context",
+            value=f"{len(self.context)} users in memory, {self.context.total_tokens} tokens\n{self.compactor.passes} compactions saved {self.compactor.saved_tokens} tokens",
+            inline=False,
+        )
+        embed.add_field(
+            name="Transcription",
+            value=f"{self.transcription.engine.name} {self.transcription.engine.model_name}: {self.transcription.format_state()}\n{self.transcription.cache.hits} cache hits, {self.transcription.cache.misses} misses",
+            inline=False,
+        )
+
+        await context.send(embed=embed)
+
+    @commands.is_owner()
+    @ai.command(description="Show the slowest recent request traces")
+    @app_commands.describe(count="Number of traces to show")
+    async def traces(self, context: Context, count: int = 3):
+        if not tracer.enabled:
+            await context.send(
+                "Tracing is disabled, enable it in config.json.", ephemeral=True
+            )
+            return
+
+        description = ""
+        for root, spans in tracer.slowest(count):
+            block = f"```\n{format_trace(root, spans)}\n```"
+            if len(description) + len(block) > 4000:
+                break
+            description += block
+
+        embed = discord.Embed(
+            title="Slowest Traces",
+            description=description or "No traces recorded yet.",
+            color=discord.Color.green(),
+        )
+        embed.set_footer(
+            text=f"{len(tracer.recent)} recent traces, spans in {tracer.path}"
+        )
+
+        await context.send(embed=embed, ephemeral=True)
+
 
 async def setup(bot) -> None:
     await bot.add_cog(AI(bot))
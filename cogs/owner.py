@@ -1,18 +1,19 @@
 import ast
+from time import perf_counter
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 from discord.ext.commands import Context
 
-from utils.jsons import ConfigJSON
+from utils.config import configs
 
 
 class Owner(commands.Cog, name="owner"):
     def __init__(self, bot) -> None:
         self.bot = bot
 
-    config = ConfigJSON().load_json()
+    config = configs.json("config/config.json")
 
     @commands.command(
         name="sync",
@@ -127,6 +128,7 @@ class Owner(commands.Cog, name="owner"):
     @app_commands.guilds(discord.Object(id=config["main_guild_id"]))
     @commands.is_owner()
     async def reload(self, context: Context, cog: str) -> None:
+        before_time = perf_counter()
         try:
             await self.bot.reload_extension(f"cogs.{cog}")
         except Exception:
@@ -136,7 +138,8 @@ class Owner(commands.Cog, name="owner"):
             await context.send(embed=embed)
             return
         embed = discord.Embed(
-            description=f"Successfully reloaded the `{cog}` cog.", color=0xBEBEFE
+            description=f"Successfully reloaded the `{cog}` cog in {round(perf_counter() - before_time, 3)}s.",
+            color=0xBEBEFE,
         )
         await context.send(embed=embed)
 
@@ -1,25 +1,20 @@
-import json
+import asyncio
 import logging
 import os
 import platform
 import sys
+from time import perf_counter
 
 import discord
 from discord.ext import commands, tasks
 from discord.ext.commands import Context
 from dotenv import load_dotenv
 
-from utils.jsons import AIConfigJSON
-
-if not os.path.isfile(
-    f"{os.path.realpath(os.path.dirname(__file__))}/config/config.json"
-):
-    sys.exit("'config.json' not found! Please add it and try again.")
-else:
-    with open(
-        f"{os.path.realpath(os.path.dirname(__file__))}/config/config.json"
-    ) as file:
-        config = json.load(file)
+from utils.config import configs
+from utils.metrics import metrics
+from utils.startup import startup
+from utils.stats import RequestStats
+from utils.tracing import tracer
 
 intents = discord.Intents(messages=True, guilds=True, message_content=True)
 
@@ -58,19 +53,6 @@ class LoggingFormatter(logging.Formatter):
 logger = logging.getLogger("NebulaAI")
 logger.setLevel(logging.INFO)
 
-# Console handler
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(LoggingFormatter())
-# File handler
-file_handler = logging.FileHandler(filename="discord.log", encoding="utf-8", mode="w")
-file_handler_formatter = logging.Formatter(
-    "[{asctime}] [{levelname:<8}] {name}: {message}", "%Y-%m-%d %H:%M:%S", style="{"
-)
-file_handler.setFormatter(file_handler_formatter)
-
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
-
 
 class DiscordBot(commands.AutoShardedBot):
     def __init__(self) -> None:
@@ -81,6 +63,7 @@ class DiscordBot(commands.AutoShardedBot):
         )
         self.logger = logger
         self.config = config
+        self.stats = RequestStats()
 
     async def load_cogs(self) -> None:
         cogs_dir = f"{os.path.realpath(os.path.dirname(__file__))}/cogs"
@@ -95,22 +78,26 @@ class DiscordBot(commands.AutoShardedBot):
             if file.endswith(".py") and file not in config_cogs
         ]
 
-        for file in config_cogs + other_cogs:
-            extension = file[:-3]
-            try:
+        # Config cogs still load first, the rest don't depend on each other
+        for file in config_cogs:
+            await self.load_cog(file[:-3])
+        await asyncio.gather(*(self.load_cog(file[:-3]) for file in other_cogs))
+
+    async def load_cog(self, extension: str) -> None:
+        try:
+            with startup.phase(f"extension {extension}"):
                 await self.load_extension(f"cogs.{extension}")
-                self.logger.info(f"Loaded extension '{extension}'")
-            except Exception as e:
-                exception = f"{type(e).__name__}: {e}"
-                self.logger.error(f"Failed to load extension {extension}\n{exception}")
+            self.logger.info(f"Loaded extension '{extension}'")
+        except Exception as e:
+            exception = f"{type(e).__name__}: {e}"
+            self.logger.error(f"Failed to load extension {extension}\n{exception}")
 
     @tasks.loop(minutes=5.0)
     async def status_task(self) -> None:
-        json = AIConfigJSON().load_json()
         await bot.change_presence(
             activity=discord.Activity(
                 type=discord.ActivityType.watching,
-                name=f"{json['total_requests']} total requests",
+                name=f"{self.stats.total} total requests",
             )
         )
 
@@ -126,8 +113,35 @@ class DiscordBot(commands.AutoShardedBot):
             f"Running on: {platform.system()} {platform.release()} ({os.name})"
         )
         self.logger.info("-------------------")
-        await self.load_cogs()
+        startup.phases["import and login"] = perf_counter() - startup.started
+        with startup.phase("configs"):
+            await configs.start()
+        with startup.phase("stats"):
+            await self.stats.start()
+        with startup.phase("tracing"):
+            tracer.configure(config.get("tracing", {}))
+            await tracer.start()
+        metrics_config = config.get("metrics", {})
+        if metrics_config.get("enabled", False):
+            with startup.phase("metrics"):
+                await metrics.start(
+                    metrics_config.get("host", "127.0.0.1"),
+                    metrics_config.get("port", 9100),
+                )
+            self.logger.info(
+                f"Serving metrics on http://{metrics_config.get('host', '127.0.0.1')}:{metrics_config.get('port', 9100)}/metrics"
+            )
+        with startup.phase("cogs"):
+            await self.load_cogs()
         self.status_task.start()
+        startup.finish()
+
+    async def close(self) -> None:
+        await super().close()
+        await self.stats.close()
+        await metrics.close()
+        await tracer.close()
+        await configs.close()
 
     async def on_message(self, message: discord.Message) -> None:
         if message.author == self.user or message.author.bot:
@@ -198,7 +212,34 @@ class DiscordBot(commands.AutoShardedBot):
             raise error
 
 
-load_dotenv()
-
-bot = DiscordBot()
-bot.run(os.getenv("TOKEN"))
+# Transcription workers are spawned processes that import this module again, they
+# must not read the config, truncate the log file or start another bot
+if __name__ == "__main__":
+    if not os.path.isfile(
+        f"{os.path.realpath(os.path.dirname(__file__))}/config/config.json"
+    ):
+        sys.exit("'config.json' not found! Please add it and try again.")
+    else:
+        config = configs.json("config/config.json")
+
+    # Console handler
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(LoggingFormatter())
+    # File handler
+    file_handler = logging.FileHandler(
+        filename="discord.log", encoding="utf-8", mode="w"
+    )
+    file_handler_formatter = logging.Formatter(
+        "[{asctime}] [{levelname:<8}] {name}: {message}",
+        "%Y-%m-%d %H:%M:%S",
+        style="{",
+    )
+    file_handler.setFormatter(file_handler_formatter)
+
+    logger.addHandler(console_handler)
+    logger.addHandler(file_handler)
+
+    load_dotenv()
+
+    bot = DiscordBot()
+    bot.run(os.getenv("TOKEN"))
@@ -1,10 +1,16 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
+from json import loads
 from os import listdir, path
+from re import match
 
 import discord
 from openai import AsyncOpenAI
 
+from utils.classifier import IntentClassifier
+from utils.status import status
+from utils.tracing import traced
+
 
 class AIPlugin(ABC):
     name = "Plugin"
@@ -13,6 +19,7 @@ class AIPlugin(ABC):
 
     def __init__(self):
         self.prompts = self.load_prompts()
+        self.classifier = self.load_classifier()
         print(
             f"\x1b[30m\x1b[1m{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\x1b[0m \x1b[34m\x1b[1mINFO    \x1b[0m \x1b[32m\x1b[1mNebulaAI\x1b[0m Loaded AI plugin '{self.name}'"
         )
@@ -24,10 +31,13 @@ class AIPlugin(ABC):
     async def plugin_unload(self):
         pass
 
+    def get_prompt_dir(self) -> str:
+        plugin_file_name = str(self.__class__).split(".")[1]
+        return f"config/prompts/{plugin_file_name}"
+
     def load_prompts(self) -> dict:
         prompts = {}
-        plugin_file_name = str(self.__class__).split(".")[1]
-        prompt_dir = f"config/prompts/{plugin_file_name}"
+        prompt_dir = self.get_prompt_dir()
         if path.exists(prompt_dir):
             for filename in listdir(prompt_dir):
                 if filename.endswith(".md"):
@@ -40,6 +50,43 @@ class AIPlugin(ABC):
     def get_prompt(self, prompt_name) -> str:
         return self.prompts.get(prompt_name, "")
 
+    def load_classifier(self):
+        examples_file = path.join(self.get_prompt_dir(), "examples.json")
+        if not path.exists(examples_file):
+            return None
+
+        with open(examples_file, "r") as file:
+            examples = loads(file.read())
+        positive = list(examples["positive"])
+        negative = list(examples["negative"])
+
+        # The "General rules" in check.md double as extra training examples
+        for line in self.get_prompt("check").splitlines():
+            rule = match(
+                r"- (Higher|Lower|Below half|0\.00) confidence (?:for|if) (.+)", line
+            )
+            if rule:
+                if rule.group(1) == "Higher":
+                    positive.append(rule.group(2))
+                else:
+                    negative.append(rule.group(2))
+
+        return IntentClassifier(positive, negative)
+
+    def classify(self, text: str, classifier_config: dict):
+        if self.classifier is None or not classifier_config.get("enabled", True):
+            return None
+
+        score = round(self.classifier.score(text), 2)
+        low, high = classifier_config.get("uncertain", [0.30, 0.70])
+        if score <= low:
+            return False, score
+        if score >= high:
+            return True, score
+
+        # Uncertain, let the caller ask the LLM
+        return None
+
     @abstractmethod
     async def process(
         self,
@@ -47,6 +94,7 @@ class AIPlugin(ABC):
         message: discord.Message,
         content: str,
         context: list,
+        confidence: float = None,
     ):
         pass
 
@@ -54,6 +102,7 @@ class AIPlugin(ABC):
     async def should_use_plugin(
         self,
         message: discord.Message,
+        content: str,
     ):
         pass
 
@@ -64,6 +113,7 @@ class AIPlugin(ABC):
         )
         return await message.reply(embed=embed)
 
+    @traced("update_embed")
     async def update_embed(
         self, embed_message: discord.Message, description: str, error: bool = False
     ):
@@ -71,8 +121,12 @@ class AIPlugin(ABC):
             description=f"{'<:error:1294770298649972850>' if error else '<a:loading:1292980861142040606>'} {description}",
             color=discord.Color.red() if error else discord.Color.blue(),
         )
-        await embed_message.edit(embed=embed)
+        if error:
+            await status.flush(embed_message, embed=embed)
+        else:
+            status.update(embed_message, embed=embed)
 
+    @traced("get_tool_response")
     async def get_tool_response(
         self, client: AsyncOpenAI, model: str, content: str, context: list = None
     ):
@@ -7,6 +7,7 @@ from aiohttp import ClientSession
 from openai import AsyncOpenAI
 
 from utils.colorthief import get_color
+from utils.status import status
 
 from ._plugin import AIPlugin
 
@@ -39,54 +40,49 @@ class ImageGenPlugin(AIPlugin):
         message,
         content,
         context,
+        confidence=None,
     ):
-        should_use, confidence = await self.should_use_stable_diffusion(content)
-        if should_use:
-            await self.update_embed(initial_message, "Generating image...")
-            stable_diffusion_prompt = await self.generate_stable_diffusion_prompt(
-                content
-            )
-
-            async with self.session.post(
-                "http://127.0.0.1:8000/api/generate",
-                json={"prompt": stable_diffusion_prompt, "use_openvino": True},
-            ) as resp:
-                if resp.status == 200:
-                    response = await resp.json()
-                    image_data = response["images"][0]
-                    latency = response["latency"]
-
-                    image_bytes = b64decode(image_data)
-
-                    image_stream = BytesIO(image_bytes)
-                    image_stream.seek(0)
-
-                    file = discord.File(
-                        fp=image_stream, filename=f"SPOILER_generated_image.png"
-                    )
-
-                    plugin_info = f"Used plugin: {self.name}{f' ({confidence} confidence) ' if confidence else ''}\n\n"
-                    embed = discord.Embed(
-                        description=f"{plugin_info}time {latency}s",
-                        color=await get_color(message.author.avatar.url),
-                        timestamp=datetime.now(),
-                    )
-                    embed.set_footer(
-                        text=f"Request from {message.author.name}",
-                        icon_url=message.author.avatar.url,
-                    )
-                    await initial_message.edit(embed=embed, attachments=[file])
-
-                    return True
-                else:
-                    await self.update_embed(
-                        initial_message, "Failed to generate image.", error=True
-                    )
-                    return True
-
-        return None
-
-    async def should_use_stable_diffusion(self, content):
+        await self.update_embed(initial_message, "Generating image...")
+        stable_diffusion_prompt = await self.generate_stable_diffusion_prompt(content)
+
+        async with self.session.post(
+            "http://127.0.0.1:8000/api/generate",
+            json={"prompt": stable_diffusion_prompt, "use_openvino": True},
+        ) as resp:
+            if resp.status == 200:
+                response = await resp.json()
+                image_data = response["images"][0]
+                latency = response["latency"]
+
+                image_bytes = b64decode(image_data)
+
+                image_stream = BytesIO(image_bytes)
+                image_stream.seek(0)
+
+                file = discord.File(
+                    fp=image_stream, filename=f"SPOILER_generated_image.png"
+                )
+
+                plugin_info = f"Used plugin: {self.name}{f' ({confidence} confidence) ' if confidence else ''}\n\n"
+                embed = discord.Embed(
+                    description=f"{plugin_info}time {latency}s",
+                    color=await get_color(message.author.avatar.url),
+                    timestamp=datetime.now(),
+                )
+                embed.set_footer(
+                    text=f"Request from {message.author.name}",
+                    icon_url=message.author.avatar.url,
+                )
+                await status.flush(initial_message, embed=embed, attachments=[file])
+
+                return True
+            else:
+                await self.update_embed(
+                    initial_message, "Failed to generate image.", error=True
+                )
+                return True
+
+    async def should_use_plugin(self, message, content):
         if any(phrase in content.lower() for phrase in self.trigger_phrases):
             return True, 1.0
 
@@ -20,29 +20,27 @@ class ImagesPlugin(AIPlugin):
         message: discord.Message,
         content: str,
         context: list,
+        confidence: float = None,
     ):
-        should_search, confidence = await self.should_use_plugin(message)
-        if should_search:
-            await self.update_embed(
-                initial_message, "AI is typing a response based on the image..."
-            )
-            prompt = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": content},
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": f"{message.attachments[0].url}"},
-                        },
-                    ],
-                },
-            ]
-
-            return prompt
-        return None
-
-    async def should_use_plugin(self, message: discord.Message):
+        await self.update_embed(
+            initial_message, "AI is typing a response based on the image..."
+        )
+        prompt = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": content},
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": f"{message.attachments[0].url}"},
+                    },
+                ],
+            },
+        ]
+
+        return prompt
+
+    async def should_use_plugin(self, message: discord.Message, content: str):
         if message.attachments:
             if message.attachments[0].content_type.startswith("image/"):
                 return True, 1.00
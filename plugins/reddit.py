@@ -1,7 +1,8 @@
 from re import search
 
 import discord
-from asyncpraw import Reddit
+
+from utils.startup import lazy_import
 
 from ._plugin import AIPlugin
 
@@ -10,7 +11,7 @@ class RedditPlugin(AIPlugin):
     name = "Reddit"
 
     def __init__(self, client_id, client_secret, user_agent):
-        self.reddit = Reddit(
+        self.reddit = lazy_import("asyncpraw").Reddit(
             client_id=client_id,
             client_secret=client_secret,
             user_agent=user_agent,
@@ -28,29 +29,33 @@ class RedditPlugin(AIPlugin):
         message: discord.Message,
         content: str,
         context: list,
+        confidence: float = None,
     ):
         reddit_url = self.extract_reddit_url(content)
-        if reddit_url:
-            await self.update_embed(initial_message, "Fetching data from Reddit...")
-            title, content, comments = await self.fetch_data(reddit_url)
-            if not comments:
-                await self.update_embed(
-                    initial_message,
-                    "Failed to fetch data.",
-                    error=True,
-                )
-                return None
-
-            await self.update_embed(initial_message, "AI is analyzing the post...")
-            prompt = [
-                {
-                    "role": "user",
-                    "content": f"User query: {content}\n\nReddit post title: {title}\n\nReddit post content:\n{content}\n\nTop Reddit post comments:\n```\n{comments}\n```\n\nPlease analyze these comments and follow what the user asked you to do and/or say using this information. Do not write a response to this unless asked, only follow what the user asked.",
-                },
-            ]
-
-            return prompt
-        return None
+        await self.update_embed(initial_message, "Fetching data from Reddit...")
+        title, content, comments = await self.fetch_data(reddit_url)
+        if not comments:
+            await self.update_embed(
+                initial_message,
+                "Failed to fetch data.",
+                error=True,
+            )
+            return None
+
+        await self.update_embed(initial_message, "AI is analyzing the post...")
+        prompt = [
+            {
+                "role": "user",
+                "content": f"User query: {content}\n\nReddit post title: {title}\n\nReddit post content:\n{content}\n\nTop Reddit post comments:\n```\n{comments}\n```\n\nPlease analyze these comments and follow what the user asked you to do and/or say using this information. Do not write a response to this unless asked, only follow what the user asked.",
+            },
+        ]
+
+        return prompt
+
+    async def should_use_plugin(self, message: discord.Message, content: str):
+        if self.extract_reddit_url(content):
+            return True, 1.00
+        return False, 0.00
 
     async def fetch_data(self, submission_url, limit=10):
         try:
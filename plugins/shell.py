@@ -5,12 +5,12 @@ from time import time
 
 import discord
 from aiohttp import ClientSession
-from asyncssh import Error as AsyncSSHError
-from asyncssh import connect, read_private_key
 from openai import AsyncOpenAI
 
 from utils.colorthief import get_color
 from utils.container import SSHContainer
+from utils.startup import lazy_import_async
+from utils.status import status
 
 from ._plugin import AIPlugin
 
@@ -32,80 +32,80 @@ class ShellPlugin(AIPlugin):
         message,
         content,
         context,
+        confidence=None,
     ):
-        should_use, confidence = await self.should_use_plugin(content)
-        if should_use:
-            await self.update_embed(initial_message, "Generating commands...")
-            gen_before_time = time()
-            commands = await self.generate_commands(content)
-            gen_processed_time = round(time() - gen_before_time, 3)
-
-            try:
-                private_key = read_private_key("config/docker.pem")
-
-                before_time = time()
-                async with connect(
-                    self.ai_config["container_host"]["ip"],
-                    username=self.ai_config["container_host"]["username"],
-                    client_keys=[private_key],
-                ) as conn:
-                    container = SSHContainer(conn)
-
-                    await self.update_embed(initial_message, "Starting container...")
-                    container_id = await container.start_container()
-
-                    await self.update_embed(initial_message, "Running commands...")
-                    results = []
-                    for cmd in (
-                        commands.replace("```bash", "```")
-                        .replace("```shell", "```")
-                        .split("```")[1:]
-                    ):
-                        print(cmd)
-                        cmd = cmd.strip().split("```")[0].strip()
-                        if cmd:
-                            result = await container.exec_in_container(
-                                container_id, cmd
-                            )
-                            results.append(result)
-
-                    await container.force_stop_container(container_id)
-
-                    processed_time = round(time() - before_time, 3)
-
-                    out = ""
-                    for result in results:
-                        out += f"$ {result['command']}\n"
-                        out += f"{result['output']}{result['error']}\n"
-
-                    plugin_info = f"Used plugin: {self.name}{f' ({confidence} confidence) ' if confidence else ''}\n\n"
-                    embed = discord.Embed(
-                        description=f"{plugin_info}gen {gen_processed_time}s, exec {processed_time}s",
-                        color=await get_color(message.author.avatar.url),
-                        timestamp=datetime.now(),
-                    )
-                    embed.set_footer(
-                        text=f"Request from {message.author.name}",
-                        icon_url=message.author.avatar.url,
-                    )
-
-                    await self.send_split_message(initial_message, out, embed)
-            except AsyncSSHError as e:
-                await self.update_embed(
-                    initial_message, f"SSH connection failed: {str(e)}", error=True
+        await self.update_embed(initial_message, "Generating commands...")
+        gen_before_time = time()
+        commands = await self.generate_commands(content)
+        gen_processed_time = round(time() - gen_before_time, 3)
+
+        asyncssh = await lazy_import_async("asyncssh")
+        try:
+            private_key = asyncssh.read_private_key("config/docker.pem")
+
+            before_time = time()
+            async with asyncssh.connect(
+                self.ai_config["container_host"]["ip"],
+                username=self.ai_config["container_host"]["username"],
+                client_keys=[private_key],
+            ) as conn:
+                container = SSHContainer(conn)
+
+                await self.update_embed(initial_message, "Starting container...")
+                container_id = await container.start_container()
+
+                await self.update_embed(initial_message, "Running commands...")
+                results = []
+                for cmd in (
+                    commands.replace("```bash", "```")
+                    .replace("```shell", "```")
+                    .split("```")[1:]
+                ):
+                    print(cmd)
+                    cmd = cmd.strip().split("```")[0].strip()
+                    if cmd:
+                        result = await container.exec_in_container(container_id, cmd)
+                        results.append(result)
+
+                await container.force_stop_container(container_id)
+
+                processed_time = round(time() - before_time, 3)
+
+                out = ""
+                for result in results:
+                    out += f"$ {result['command']}\n"
+                    out += f"{result['output']}{result['error']}\n"
+
+                plugin_info = f"Used plugin: {self.name}{f' ({confidence} confidence) ' if confidence else ''}\n\n"
+                embed = discord.Embed(
+                    description=f"{plugin_info}gen {gen_processed_time}s, exec {processed_time}s",
+                    color=await get_color(message.author.avatar.url),
+                    timestamp=datetime.now(),
                 )
-            except Exception as e:
-                await self.update_embed(
-                    initial_message,
-                    f"An unexpected error occurred: {str(e)}",
-                    error=True,
+                embed.set_footer(
+                    text=f"Request from {message.author.name}",
+                    icon_url=message.author.avatar.url,
                 )
 
-            return True
+                await self.send_split_message(initial_message, out, embed)
+        except asyncssh.Error as e:
+            await self.update_embed(
+                initial_message, f"SSH connection failed: {str(e)}", error=True
+            )
+        except Exception as e:
+            await self.update_embed(
+                initial_message,
+                f"An unexpected error occurred: {str(e)}",
+                error=True,
+            )
+
+        return True
 
-        return None
+    async def should_use_plugin(self, message, content: str):
+        local_result = self.classify(content, self.ai_config.get("classifier", {}))
+        if local_result is not None:
+            return local_result
 
-    async def should_use_plugin(self, content: str):
         prompt = [
             {
                 "role": "system",
@@ -163,7 +163,8 @@ class ShellPlugin(AIPlugin):
         if len(content) > 1990:
             file = discord.File(BytesIO(content.encode()), filename="output.txt")
 
-            await initial_message.edit(
+            await status.flush(
+                initial_message,
                 content="Your shell output was too long and has been written to a text file.",
                 attachments=[file],
                 embed=embed,
@@ -172,6 +173,6 @@ class ShellPlugin(AIPlugin):
             return [initial_message]
         else:
             formatted_content = f"```bash\n{content}\n```"
-            await initial_message.edit(content=formatted_content, embed=embed)
+            await status.flush(initial_message, content=formatted_content, embed=embed)
 
             return [initial_message]
@@ -2,7 +2,8 @@ import re
 
 import discord
 from aiohttp import ClientSession
-from bs4 import BeautifulSoup
+
+from utils.startup import lazy_import_async
 
 from ._plugin import AIPlugin
 
@@ -21,31 +22,35 @@ class TwitterPlugin(AIPlugin):
         message: discord.Message,
         content: str,
         context: list,
+        confidence: float = None,
     ):
         twitter_username = self.extract_twitter_username(content)
-        if twitter_username:
+        await self.update_embed(
+            initial_message, f"Fetching tweets from @{twitter_username}..."
+        )
+        tweets = await self.fetch_tweets(twitter_username)
+        if not tweets:
             await self.update_embed(
-                initial_message, f"Fetching tweets from @{twitter_username}..."
+                initial_message,
+                f"Failed to fetch tweets from @{twitter_username}.",
+                error=True,
             )
-            tweets = await self.fetch_tweets(twitter_username)
-            if not tweets:
-                await self.update_embed(
-                    initial_message,
-                    f"Failed to fetch tweets from @{twitter_username}.",
-                    error=True,
-                )
-                return None
+            return None
+
+        await self.update_embed(initial_message, "AI is analyzing the tweets...")
+        prompt = [
+            {
+                "role": "user",
+                "content": f"User query: {content}\n\nRecent tweets from @{twitter_username}:\n{tweets}\n\nPlease analyze these tweets and respond to the user's query.",
+            },
+        ]
 
-            await self.update_embed(initial_message, "AI is analyzing the tweets...")
-            prompt = [
-                {
-                    "role": "user",
-                    "content": f"User query: {content}\n\nRecent tweets from @{twitter_username}:\n{tweets}\n\nPlease analyze these tweets and respond to the user's query.",
-                },
-            ]
+        return prompt
 
-            return prompt
-        return None
+    async def should_use_plugin(self, message: discord.Message, content: str):
+        if self.extract_twitter_username(content):
+            return True, 1.00
+        return False, 0.00
 
     def extract_twitter_username(self, content):
         match = re.search(r"@(\w+)", content)
@@ -58,7 +63,8 @@ class TwitterPlugin(AIPlugin):
                 return None
 
             html = await response.text()
-            soup = BeautifulSoup(html, "html.parser")
+            bs4 = await lazy_import_async("bs4")
+            soup = bs4.BeautifulSoup(html, "html.parser")
             tweets = soup.find_all("div", class_="tweet-content", limit=num_tweets)
 
             if not tweets:
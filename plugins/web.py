@@ -4,10 +4,12 @@ from re import search
 
 import discord
 from aiohttp import ClientSession
-from bs4 import BeautifulSoup
-from duckduckgo_search import AsyncDDGS
 from openai import AsyncOpenAI
 
+from utils.metrics import scrape_seconds
+from utils.startup import lazy_import_async
+from utils.tracing import traced, tracer
+
 from ._plugin import AIPlugin
 
 
@@ -47,38 +49,41 @@ class WebPlugin(AIPlugin):
         message: discord.Message,
         content: str,
         context: list,
+        confidence: float = None,
     ):
-        should_search, confidence = await self.should_use_plugin(message)
-        if should_search:
-            await self.update_embed(initial_message, "Searching the web...")
+        await self.update_embed(initial_message, "Searching the web...")
 
-            tool_response = await self.get_tool_response(
-                self.client, self.ai_config["models"]["text"], content, context
+        tool_response = await self.get_tool_response(
+            self.client, self.ai_config["models"]["text"], content, context
+        )
+        if tool_response.tool_calls:
+            call = tool_response.tool_calls[0]
+            print(call)
+            search_results = await self.search_web(
+                loads(call.function.arguments).get("query")
             )
-            if tool_response.tool_calls:
-                call = tool_response.tool_calls[0]
-                print(call)
-                search_results = await self.search_web(
-                    loads(call.function.arguments).get("query")
-                )
-
-                prompt = [
-                    {
-                        "role": "user",
-                        "content": f"User query: {content}\n\nRelevant web results:\n{search_results}\n\nPlease provide a response based on this information.",
-                    }
-                ]
-
-                return prompt, confidence
+
+            prompt = [
+                {
+                    "role": "user",
+                    "content": f"User query: {content}\n\nRelevant web results:\n{search_results}\n\nPlease provide a response based on this information.",
+                }
+            ]
+
+            return prompt
 
         return None
 
-    async def should_use_plugin(self, message: discord.Message):
+    async def should_use_plugin(self, message: discord.Message, content: str):
         if message.attachments:
             if message.attachments[0].content_type.startswith("image/"):
                 return False, 0.00
 
-        text = message.content.lower().strip().lstrip(";")
+        text = content.lower().strip()
+
+        local_result = self.classify(text, self.ai_config.get("classifier", {}))
+        if local_result is not None:
+            return local_result
 
         prompt = [
             {
@@ -112,6 +117,7 @@ class WebPlugin(AIPlugin):
         except:
             return False, 0.00
 
+    @traced("get_search_query")
     async def get_search_query(self, content: str, context: list) -> str:
         context_text = [msg["content"] for msg in context if msg["role"] == "assistant"]
         prompt = [
@@ -133,11 +139,14 @@ class WebPlugin(AIPlugin):
 
         return completion.choices[0].message.content.strip()
 
+    @traced("search_web")
     async def search_web(self, query: str, num_results: int = 3) -> str:
         proxy = choice(self.proxies) if self.proxies else None
-        results = await AsyncDDGS(proxy=proxy).atext(
-            query, safesearch="on", max_results=num_results, backend="api"
-        )
+        duckduckgo_search = await lazy_import_async("duckduckgo_search")
+        with tracer.span("duckduckgo"):
+            results = await duckduckgo_search.AsyncDDGS(proxy=proxy).atext(
+                query, safesearch="on", max_results=num_results, backend="api"
+            )
 
         if not results:
             return "No results found."
@@ -151,12 +160,18 @@ class WebPlugin(AIPlugin):
 
         return "\n\n".join(scraped_content)
 
+    @traced("scrape_website")
     async def scrape_website(self, url: str) -> str:
+        with scrape_seconds.time():
+            return await self.fetch_page(url)
+
+    async def fetch_page(self, url: str) -> str:
         try:
             async with self.session.get(url, timeout=10) as response:
                 if response.status == 200:
                     html = await response.text()
-                    soup = BeautifulSoup(html, "html.parser")
+                    bs4 = await lazy_import_async("bs4")
+                    soup = bs4.BeautifulSoup(html, "html.parser")
 
                     for element in soup(
                         ["header", "nav", "footer", "aside", "script", "style"]
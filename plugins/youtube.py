@@ -3,8 +3,9 @@ from tempfile import TemporaryDirectory
 
 import discord
 from aiohttp import ClientSession
-from whisper import Whisper
-from yt_dlp import YoutubeDL
+
+from utils.startup import lazy_import_async
+from utils.transcription import TranscriptionQueueFull, TranscriptionService
 
 from ._plugin import AIPlugin
 
@@ -12,9 +13,9 @@ from ._plugin import AIPlugin
 class YouTubePlugin(AIPlugin):
     name = "YouTube"
 
-    def __init__(self, session: ClientSession, whisper_model: Whisper):
+    def __init__(self, session: ClientSession, transcription: TranscriptionService):
         self.session = session
-        self.whisper_model = whisper_model
+        self.transcription = transcription
 
         self.ydl_opts = {
             "format": "bestaudio/best",
@@ -35,35 +36,59 @@ class YouTubePlugin(AIPlugin):
         message: discord.Message,
         content: str,
         context: list,
+        confidence: float = None,
     ):
-        if "youtube.com" in content or "youtu.be" in content:
-            await self.update_embed(initial_message, "Processing the YouTube video...")
-            video_url = self.extract_youtube_url(content)
-            print(video_url)
-            if not video_url:
-                await self.update_embed(
-                    initial_message, "Invalid YouTube URL provided.", error=True
-                )
-                return None
+        await self.update_embed(initial_message, "Processing the YouTube video...")
+        video_url = self.extract_youtube_url(content)
+        print(video_url)
+        if not video_url:
+            await self.update_embed(
+                initial_message, "Invalid YouTube URL provided.", error=True
+            )
+            return None
 
-            title, transcript = await self.transcribe_youtube_video(video_url)
-            print(transcript)
-            if not transcript:
+        async def on_position(position: int):
+            if position:
                 await self.update_embed(
-                    initial_message, "Failed to transcribe the video.", error=True
+                    initial_message,
+                    f"Waiting to transcribe the video (position {position})...",
                 )
-                return None
+            else:
+                await self.update_embed(initial_message, "Transcribing the video...")
 
-            await self.update_embed(initial_message, "AI is analyzing the video...")
-            prompt = [
-                {
-                    "role": "user",
-                    "content": f"User query: {content}\n\nYouTube video title: {title}\n\nYouTube video transcript:\n{transcript}\n\nPlease follow what the user asked you to do and/or say using this information.",
-                },
-            ]
+        try:
+            title, transcript = await self.transcribe_youtube_video(
+                video_url, on_position
+            )
+        except TranscriptionQueueFull:
+            await self.update_embed(
+                initial_message,
+                "Too many transcriptions are queued right now, try again later.",
+                error=True,
+            )
+            return None
 
-            return prompt
-        return None
+        print(transcript)
+        if not transcript:
+            await self.update_embed(
+                initial_message, "Failed to transcribe the video.", error=True
+            )
+            return None
+
+        await self.update_embed(initial_message, "AI is analyzing the video...")
+        prompt = [
+            {
+                "role": "user",
+                "content": f"User query: {content}\n\nYouTube video title: {title}\n\nYouTube video transcript:\n{transcript}\n\nPlease follow what the user asked you to do and/or say using this information.",
+            },
+        ]
+
+        return prompt
+
+    async def should_use_plugin(self, message: discord.Message, content: str):
+        if "youtube.com" in content or "youtu.be" in content:
+            return True, 1.00
+        return False, 0.00
 
     def extract_youtube_url(self, content):
         words = content.split()
@@ -72,7 +97,7 @@ class YouTubePlugin(AIPlugin):
                 return word
         return None
 
-    async def transcribe_youtube_video(self, video_url: str):
+    async def transcribe_youtube_video(self, video_url: str, on_position=None):
         try:
             loop = asyncio.get_event_loop()
 
@@ -80,22 +105,31 @@ class YouTubePlugin(AIPlugin):
                 opts = self.ydl_opts.copy()
                 opts["outtmpl"] = f"{temp}/%(id)s.%(ext)s"
 
-                with YoutubeDL(opts) as ydl:
+                yt_dlp = await lazy_import_async("yt_dlp")
+                with yt_dlp.YoutubeDL(opts) as ydl:
                     info = await loop.run_in_executor(
                         None, lambda: ydl.extract_info(video_url, download=False)
                     )
                     title = info["title"]
                     video_id = info["id"]
 
+                    # Reposted links skip the download and the transcription
+                    key = self.transcription.cache_key("youtube", video_id)
+                    result = await self.transcription.cached(key)
+                    if result is not None:
+                        return title, result["text"]
+
                     await loop.run_in_executor(None, lambda: ydl.download([video_url]))
 
                 audio_file = f"{temp}/{video_id}.wav"
 
-                result = await loop.run_in_executor(
-                    None, lambda: self.whisper_model.transcribe(audio_file)
+                result = await self.transcription.transcribe(
+                    audio_file, TranscriptionService.YOUTUBE, on_position, key
                 )
 
             return title, result["text"]
+        except TranscriptionQueueFull:
+            raise
         except Exception as e:
             print(f"Error transcribing YouTube video: {e}")
-            return None
+            return None, None
@@ -0,0 +1,241 @@
+import asyncio
+from collections import OrderedDict
+from time import perf_counter
+from traceback import format_exc
+from types import SimpleNamespace
+
+from aiohttp import ClientSession
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI
+
+from utils.metrics import llm_request_seconds, llm_ttft_seconds
+from utils.tracing import tracer
+
+
+def normalize_model(model: str) -> str:
+    return model if ":" in model else f"{model}:latest"
+
+
+class Backend:
+    def __init__(self, url: str, api_key: str, models: list = None) -> None:
+        self.url = url
+        # Failover to another backend replaces the client's own retries
+        self.client = AsyncOpenAI(base_url=url, api_key=api_key, max_retries=0)
+
+        # Models this backend is tagged with in ai.json, empty means any
+        self.configured_models = {normalize_model(model) for model in models or []}
+        # Models reported by the last /api/tags probe, None until the first probe
+        self.available_models = None
+        self.healthy = True
+        self.in_flight = 0
+
+    @property
+    def api_url(self) -> str:
+        return self.url.replace("v1/", "")
+
+    def serves(self, model: str) -> bool:
+        model = normalize_model(model)
+        if self.configured_models and model not in self.configured_models:
+            return False
+        if self.available_models is not None and model not in self.available_models:
+            return False
+        return True
+
+
+class BackendPool:
+    def __init__(
+        self,
+        base_url,
+        api_key: str,
+        session: ClientSession,
+        probe_interval: float = 30,
+        affinity_slack: int = 2,
+        max_affinities: int = 10000,
+    ) -> None:
+        self.api_key = api_key
+        self.session = session
+        self.probe_interval = probe_interval
+        # How many more requests a user's backend may be running than the least
+        # busy one before the user is moved off it
+        self.affinity_slack = affinity_slack
+        self.max_affinities = max_affinities
+        # Mirrors client.chat.completions.create so call sites don't change
+        self.chat = SimpleNamespace(completions=self)
+
+        self.backends = []
+        # Backends dropped by a config change, closed once their requests finish
+        self.retiring = set()
+        # user -> backend URL their conversation is cached on, least recent first
+        self.affinities = OrderedDict()
+        self.set_backends(base_url)
+        self.probe_task = None
+
+    def set_backends(self, base_url) -> None:
+        # base_url is a single URL, or a list of URLs / {"url", "models"} objects
+        entries = [base_url] if isinstance(base_url, str) else base_url
+        # Unchanged URLs keep their client, health and in-flight count
+        existing = {backend.url: backend for backend in self.backends}
+        backends = []
+        for entry in entries:
+            url, models = (
+                (entry, None)
+                if isinstance(entry, str)
+                else (entry["url"], entry.get("models"))
+            )
+            backend = existing.pop(url, None)
+            if backend:
+                backend.configured_models = {
+                    normalize_model(model) for model in models or []
+                }
+            else:
+                backend = Backend(url, self.api_key, models)
+            backends.append(backend)
+        self.backends = backends
+
+        for backend in existing.values():
+            task = asyncio.create_task(self.retire(backend))
+            self.retiring.add(task)
+            task.add_done_callback(self.retiring.discard)
+
+    async def retire(self, backend: Backend) -> None:
+        while backend.in_flight:
+            await asyncio.sleep(1)
+        await backend.client.close()
+
+    @property
+    def base_url(self) -> str:
+        return ", ".join(backend.url for backend in self.backends)
+
+    def models(self) -> list:
+        models = set()
+        for backend in self.backends:
+            models.update(backend.available_models or backend.configured_models)
+        return sorted(models)
+
+    async def start(self) -> None:
+        if not self.probe_task:
+            self.probe_task = asyncio.create_task(self.probe_loop())
+
+    async def close(self) -> None:
+        if self.probe_task:
+            self.probe_task.cancel()
+            self.probe_task = None
+        for task in list(self.retiring):
+            task.cancel()
+        for backend in self.backends:
+            await backend.client.close()
+
+    async def probe(self, backend: Backend) -> None:
+        try:
+            async with self.session.get(
+                f"{backend.api_url}api/tags", timeout=5
+            ) as response:
+                response.raise_for_status()
+                tags = await response.json()
+            backend.available_models = {model["name"] for model in tags["models"]}
+            backend.healthy = True
+        except Exception:
+            backend.healthy = False
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self.probe(backend) for backend in self.backends))
+
+    async def probe_loop(self) -> None:
+        while True:
+            try:
+                await self.probe_all()
+            except Exception:
+                print(format_exc())
+            await asyncio.sleep(self.probe_interval)
+
+    def choose(self, model: str, tried: set, user: str = None):
+        candidates = [
+            backend
+            for backend in self.backends
+            if backend not in tried and backend.serves(model)
+        ]
+        # Unhealthy backends are only a last resort, the probe may be stale
+        healthy = [backend for backend in candidates if backend.healthy]
+        if healthy:
+            candidates = healthy
+        if not candidates:
+            return None
+
+        least_busy = min(candidates, key=lambda backend: backend.in_flight)
+        # Stay on the backend that already has this user's prompt prefix cached
+        pinned = next(
+            (
+                backend
+                for backend in candidates
+                if backend.url == self.affinities.get(user)
+            ),
+            None,
+        )
+        if pinned and pinned.in_flight - least_busy.in_flight <= self.affinity_slack:
+            return pinned
+        return least_busy
+
+    def pin(self, user: str, backend: Backend) -> None:
+        if user is None:
+            return
+        self.affinities[user] = backend.url
+        self.affinities.move_to_end(user)
+        while len(self.affinities) > self.max_affinities:
+            self.affinities.popitem(last=False)
+
+    async def create(self, **kwargs):
+        tried = set()
+        last_error = None
+        while True:
+            backend = self.choose(kwargs["model"], tried, kwargs.get("user"))
+            if backend is None:
+                if last_error:
+                    raise last_error
+                raise RuntimeError(f"No backend serves the model '{kwargs['model']}'")
+
+            tried.add(backend)
+            backend.in_flight += 1
+            before_time = perf_counter()
+            try:
+                with tracer.span("backend", url=backend.url):
+                    result = await backend.client.chat.completions.create(**kwargs)
+            except APITimeoutError:
+                # A slow backend is still up, another one would run the request twice
+                backend.in_flight -= 1
+                raise
+            except APIConnectionError as e:
+                # Fail over to the next backend and let the probe bring this one back
+                backend.in_flight -= 1
+                backend.healthy = False
+                last_error = e
+                continue
+            except BaseException:
+                backend.in_flight -= 1
+                raise
+
+            self.pin(kwargs.get("user"), backend)
+
+            if kwargs.get("stream"):
+                return self.track_stream(backend, result, kwargs["model"], before_time)
+
+            backend.in_flight -= 1
+            llm_request_seconds.observe(
+                perf_counter() - before_time, model=kwargs["model"], backend=backend.url
+            )
+            return result
+
+    async def track_stream(self, backend: Backend, stream, model: str, before_time):
+        # A streamed request keeps the backend busy until the last chunk
+        first_chunk = True
+        try:
+            async for chunk in stream:
+                if first_chunk:
+                    first_chunk = False
+                    llm_ttft_seconds.observe(
+                        perf_counter() - before_time, model=model, backend=backend.url
+                    )
+                yield chunk
+            llm_request_seconds.observe(
+                perf_counter() - before_time, model=model, backend=backend.url
+            )
+        finally:
+            backend.in_flight -= 1
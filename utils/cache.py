@@ -0,0 +1,79 @@
+import asyncio
+import json
+from collections import OrderedDict
+from hashlib import sha256
+from time import time
+
+from utils.database import CacheDatabase
+from utils.metrics import cache_lookups_total
+
+
+def make_key(*parts) -> str:
+    return sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 86400,
+        database: CacheDatabase = None,
+        name: str = "response",
+    ) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.database = database
+
+        # key -> (expires at, value), least recently used first
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry and entry[0] <= time():
+            del self.entries[key]
+            entry = None
+
+        if entry is None and self.database:
+            stored = await asyncio.to_thread(self.database.get, key)
+            if stored:
+                value, expires_at = stored
+                entry = (expires_at, value)
+                self.remember(key, entry)
+
+        if entry is None:
+            self.misses += 1
+            cache_lookups_total.inc(cache=self.name, result="miss")
+            return None
+
+        self.hits += 1
+        cache_lookups_total.inc(cache=self.name, result="hit")
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value) -> None:
+        entry = (time() + self.ttl, value)
+        self.remember(key, entry)
+        if self.database:
+            await asyncio.to_thread(self.database.set, key, value, entry[0])
+
+    def remember(self, key: str, entry: tuple) -> None:
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def format_stats(self, hit: bool) -> str:
+        return (
+            f"cache {'hit' if hit else 'miss'} ({self.hits} hits, {self.misses} misses)"
+        )
+
+    def close(self) -> None:
+        if self.database:
+            self.database.close()
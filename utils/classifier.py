@@ -0,0 +1,98 @@
+from collections import Counter
+from math import exp, log, sqrt
+from random import Random
+from re import sub
+
+
+# Character n-gram TF-IDF features with a logistic regression on top, trained
+# in-process from a handful of labelled examples
+class IntentClassifier:
+    def __init__(
+        self,
+        positive: list,
+        negative: list,
+        ngram_range: tuple = (2, 4),
+        epochs: int = 40,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4,
+    ) -> None:
+        self.ngram_range = ngram_range
+        self.idf = {}
+        self.weights = {}
+        self.bias = 0.0
+
+        self.train(positive, negative, epochs, learning_rate, l2)
+
+    def ngrams(self, text: str) -> Counter:
+        text = " " + sub(r"\s+", " ", text.lower()).strip() + " "
+        low, high = self.ngram_range
+        return Counter(
+            text[i : i + n]
+            for n in range(low, high + 1)
+            for i in range(len(text) - n + 1)
+        )
+
+    def features(self, text: str) -> dict:
+        counts = self.ngrams(text)
+        vector = {
+            gram: (1 + log(count)) * self.idf[gram]
+            for gram, count in counts.items()
+            if gram in self.idf
+        }
+        norm = sqrt(sum(value * value for value in vector.values()))
+        if norm == 0:
+            return {}
+
+        return {gram: value / norm for gram, value in vector.items()}
+
+    def train(
+        self,
+        positive: list,
+        negative: list,
+        epochs: int,
+        learning_rate: float,
+        l2: float,
+    ) -> None:
+        if not positive or not negative:
+            raise ValueError("Both positive and negative examples are required")
+        documents = [(text, 1) for text in positive] + [(text, 0) for text in negative]
+
+        document_frequency = Counter()
+        for text, _ in documents:
+            document_frequency.update(self.ngrams(text).keys())
+        self.idf = {
+            gram: log((1 + len(documents)) / (1 + frequency)) + 1
+            for gram, frequency in document_frequency.items()
+        }
+
+        # Weight the classes so an unbalanced example set doesn't skew the bias
+        class_weights = {
+            1: len(documents) / (2 * len(positive)),
+            0: len(documents) / (2 * len(negative)),
+        }
+        samples = [(self.features(text), label) for text, label in documents]
+        rng = Random(0)
+
+        for epoch in range(epochs):
+            rng.shuffle(samples)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for vector, label in samples:
+                error = (label - self.probability(vector)) * class_weights[label]
+                for gram, value in vector.items():
+                    weight = self.weights.get(gram, 0.0)
+                    self.weights[gram] = weight + rate * (error * value - l2 * weight)
+                self.bias += rate * error
+
+    def probability(self, vector: dict) -> float:
+        z = self.bias + sum(
+            self.weights.get(gram, 0.0) * value for gram, value in vector.items()
+        )
+        if z < -30:
+            return 0.0
+        if z > 30:
+            return 1.0
+
+        return 1 / (1 + exp(-z))
+
+    def score(self, text: str) -> float:
+        return self.probability(self.features(text))
@@ -1,27 +1,125 @@
+import asyncio
+from collections import OrderedDict
+from hashlib import sha256
 from io import BytesIO
-from re import sub
+from re import match, sub
+from time import time
 
 import fast_colorthief
-from aiocache import cached
-from aiohttp import ClientSession
+from aiohttp import ClientSession, ClientTimeout
 
+from utils.database import CacheDatabase
+from utils.metrics import get_color_seconds
+from utils.tracing import traced
 
-@cached(ttl=86400)
-async def get_color(query):
-    try:
-        if any(
-            s in query
-            for s in {"cdn.discordapp.com/icons/", "cdn.discordapp.com/avatars/"}
-        ):
-            query = sub(
-                r"\?size=(32|64|128|256|512|1024|2048|4096)$", "?size=16", query
-            )
-        async with ClientSession() as session:
-            async with session.get(query, timeout=5) as response:
-                content = await response.read()
+DEFAULT_COLOR = 0x505050
+
+
+def color_key(query: str) -> str:
+    # Discord avatar and icon URLs end in a content hash, so the color never changes
+    discord_asset = match(
+        r"https://cdn\.discordapp\.com/(avatars|icons)/(\d+)/([^./?]+)", query
+    )
+    if discord_asset:
+        return "/".join(discord_asset.groups())
+    return sha256(query.split("?")[0].encode()).hexdigest()
+
+
+def dominant_color(content: bytes) -> int:
+    color = fast_colorthief.get_dominant_color(BytesIO(content), quality=100)
+    return int(f"0x{color[0]:02x}{color[1]:02x}{color[2]:02x}", 16)
+
+
+class ColorCache:
+    def __init__(self) -> None:
+        self.max_entries = 4096
+        self.ttl = 30 * 86400
+        self.database = None
+        self.session = None
+
+        # key -> color, least recently used first
+        self.entries = OrderedDict()
+        self.in_flight = {}
+
+    def configure(self, colors_config) -> None:
+        self.max_entries = colors_config.get("max_entries", 4096)
+        self.ttl = colors_config.get("ttl", 30 * 86400)
+        database_path = colors_config.get("database", "config/colors.db")
+        if self.database:
+            self.database.close()
+        self.database = CacheDatabase(database_path) if database_path else None
+
+    async def close(self) -> None:
+        # A closed cache starts cold, whoever configures it next doesn't see old colors
+        self.entries.clear()
+        if self.session:
+            await self.session.close()
+            self.session = None
+        if self.database:
+            self.database.close()
+            self.database = None
+
+    def remember(self, key: str, color: int) -> None:
+        self.entries[key] = color
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
 
-        color = fast_colorthief.get_dominant_color(BytesIO(content), quality=100)
-        color = int(f"0x{color[0]:02x}{color[1]:02x}{color[2]:02x}", 16)
+    async def get(self, query: str) -> int:
+        key = color_key(query)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        # Replies to the same user at the same time share one download
+        if key not in self.in_flight:
+            self.in_flight[key] = asyncio.create_task(self.load(key, query))
+        try:
+            return await asyncio.shield(self.in_flight[key])
+        finally:
+            self.in_flight.pop(key, None)
+
+    async def load(self, key: str, query: str) -> int:
+        if self.database:
+            stored = await asyncio.to_thread(self.database.get, key)
+            if stored:
+                self.remember(key, stored[0])
+                return stored[0]
+
+        color = await self.fetch(query)
+        if color is None:
+            return DEFAULT_COLOR
+
+        self.remember(key, color)
+        if self.database:
+            await asyncio.to_thread(self.database.set, key, color, time() + self.ttl)
         return color
-    except:
-        return 0x505050
+
+    @traced("get_color")
+    async def fetch(self, query: str):
+        try:
+            if any(
+                s in query
+                for s in {"cdn.discordapp.com/icons/", "cdn.discordapp.com/avatars/"}
+            ):
+                query = sub(
+                    r"\?size=(32|64|128|256|512|1024|2048|4096)$", "?size=16", query
+                )
+            if self.session is None or self.session.closed:
+                self.session = ClientSession(timeout=ClientTimeout(total=5))
+            async with self.session.get(query) as response:
+                response.raise_for_status()
+                content = await response.read()
+
+            return await asyncio.to_thread(dominant_color, content)
+        except Exception:
+            return None
+
+
+# Shared by the AI cog and every plugin
+colors = ColorCache()
+
+
+async def get_color(query):
+    with get_color_seconds.time():
+        return await colors.get(query)
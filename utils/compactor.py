@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from traceback import format_exc
+
+from openai import AsyncOpenAI
+
+from utils.config import configs
+from utils.context import ContextStore
+from utils.scheduler import RequestScheduler
+
+logger = logging.getLogger("NebulaAI")
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+class ContextCompactor:
+    def __init__(
+        self,
+        store: ContextStore,
+        client: AsyncOpenAI,
+        scheduler: RequestScheduler,
+        ai_config,
+        compaction_config,
+    ) -> None:
+        self.store = store
+        self.client = client
+        self.scheduler = scheduler
+        self.ai_config = ai_config
+
+        self.enabled = compaction_config.get("enabled", True)
+        self.threshold_tokens = compaction_config.get("threshold_tokens", 1500)
+        # Number of newest messages that are always kept verbatim
+        self.keep_recent = compaction_config.get("keep_recent", 6)
+
+        self.tasks = {}
+        self.passes = 0
+        self.saved_tokens = 0
+
+    def schedule(self, user_id: int) -> None:
+        if not self.enabled or user_id in self.tasks:
+            return
+        if self.store.get_tokens(user_id) <= self.threshold_tokens:
+            return
+
+        task = asyncio.create_task(self.compact(user_id))
+        self.tasks[user_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(user_id, None))
+
+    async def close(self) -> None:
+        for task in self.tasks.values():
+            task.cancel()
+
+    def format_turns(self, messages: list) -> str:
+        lines = []
+        for message in messages:
+            content = message["content"]
+            if isinstance(content, list):
+                content = " ".join(
+                    part["text"] if part.get("type") == "text" else "[image]"
+                    for part in content
+                )
+            lines.append(f"{message['role']}: {content}")
+
+        return "\n\n".join(lines)
+
+    async def compact(self, user_id: int) -> None:
+        try:
+            history = self.store.get(user_id)
+            summary = self.store.get_summary(user_id)
+            summary_text = (
+                summary["content"].removeprefix(SUMMARY_PREFIX) if summary else "(none)"
+            )
+            start = 1 if summary else 0
+            end = max(len(history) - self.keep_recent, start)
+
+            # Keep the verbatim part starting on a user turn
+            while end < len(history) and history[end]["role"] != "user":
+                end += 1
+            if end <= start:
+                return
+
+            aged_out = history[start:end]
+            # Only takes a slot nobody is waiting for, replace_prefix drops the
+            # result if the history changed in the meantime
+            async with self.scheduler.slot(user_id, RequestScheduler.BACKGROUND):
+                completion = await self.client.chat.completions.create(
+                    model=self.ai_config["models"]["text"],
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": configs.text(
+                                "config/prompts/_general/compact.md"
+                            ).data,
+                        },
+                        {
+                            "role": "user",
+                            "content": f"Existing summary:\n{summary_text}\n\nNew turns:\n{self.format_turns(aged_out)}",
+                        },
+                    ],
+                )
+            text = completion.choices[0].message.content.strip()
+
+            saved = self.store.replace_prefix(
+                user_id,
+                history[:end],
+                {"role": "system", "content": f"{SUMMARY_PREFIX}{text}"},
+            )
+            if saved is None:
+                return
+
+            self.passes += 1
+            self.saved_tokens += saved
+            logger.info(
+                f"Compacted {len(aged_out)} messages for {user_id}, saved {saved} tokens ({self.saved_tokens} total over {self.passes} passes)"
+            )
+        except Exception:
+            print(format_exc())
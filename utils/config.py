@@ -0,0 +1,133 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from hashlib import sha256
+from traceback import format_exc
+from types import MappingProxyType
+
+from utils.jsons import JSONObject
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class ConfigFile(ABC):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.data = None
+        self.mtime = None
+        self.lock = asyncio.Lock()
+
+        self.load()
+
+    @abstractmethod
+    def read(self):
+        pass
+
+    def load(self) -> None:
+        mtime = os.stat(self.path).st_mtime_ns
+        self.data = self.read()
+        self.mtime = mtime
+
+    def reload_if_changed(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self.mtime:
+            return False
+
+        self.load()
+        return True
+
+
+class JSONConfig(ConfigFile):
+    def __init__(self, path: str) -> None:
+        self.json_object = JSONObject(path)
+        super().__init__(path)
+
+    def read(self):
+        return freeze(self.json_object.load_json())
+
+    def write(self, data) -> None:
+        self.json_object.write_json(data)
+
+    # Reads go to the current snapshot, so holders of this object never go stale
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    async def update(self, mutate) -> None:
+        async with self.lock:
+            data = thaw(self.data)
+            mutate(data)
+            await asyncio.to_thread(self.write, data)
+
+            self.data = freeze(data)
+            self.mtime = os.stat(self.path).st_mtime_ns
+
+
+class TextConfig(ConfigFile):
+    def read(self):
+        with open(self.path, "r") as f:
+            text = f.read().strip()
+        self.digest = sha256(text.encode()).hexdigest()
+        return text
+
+
+class ConfigService:
+    def __init__(self, poll_interval: float = 2) -> None:
+        self.poll_interval = poll_interval
+        self.files = {}
+        self.watch_task = None
+
+    def json(self, path: str) -> JSONConfig:
+        if path not in self.files:
+            self.files[path] = JSONConfig(path)
+        return self.files[path]
+
+    def text(self, path: str) -> TextConfig:
+        if path not in self.files:
+            self.files[path] = TextConfig(path)
+        return self.files[path]
+
+    async def start(self) -> None:
+        if not self.watch_task:
+            self.watch_task = asyncio.create_task(self.watch())
+
+    async def close(self) -> None:
+        if self.watch_task:
+            self.watch_task.cancel()
+            self.watch_task = None
+
+    async def watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for config_file in list(self.files.values()):
+                try:
+                    async with config_file.lock:
+                        await asyncio.to_thread(config_file.reload_if_changed)
+                except Exception:
+                    print(format_exc())
+
+
+# Shared by every cog so a reload doesn't re-read anything from disk
+configs = ConfigService()
@@ -1,28 +1,36 @@
 from shlex import quote
 
+from utils.metrics import container_exec_seconds
+from utils.tracing import traced
+
 
 class SSHContainer:
     def __init__(self, connection) -> None:
         self.connection = connection
 
+    @traced("ssh.start_container")
     async def start_container(self) -> str:
         result = await self.connection.run(
             "docker run -d --network=container:gluetun --rm ai-ssh tail -f /dev/null"
         )
         return result.stdout.strip()
 
+    @traced("ssh.stop_container")
     async def stop_container(self, container_id: str) -> None:
         await self.connection.run(f"docker stop {quote(container_id)}")
 
+    @traced("ssh.force_stop_container")
     async def force_stop_container(self, container_id: str) -> None:
         await self.connection.run(f"docker rm -f {quote(container_id)}")
 
+    @traced("ssh.exec_in_container")
     async def exec_in_container(self, container_id: str, cmd: str):
         safe_container_id = quote(container_id)
         safe_cmd = quote(cmd)
-        result = await self.connection.run(
-            f"docker exec {safe_container_id} /bin/sh -c {safe_cmd}"
-        )
+        with container_exec_seconds.time(container="shell"):
+            result = await self.connection.run(
+                f"docker exec {safe_container_id} /bin/sh -c {safe_cmd}"
+            )
 
         return {
             "command": cmd,
@@ -36,24 +44,29 @@ class PythonContainer:
     def __init__(self, connection) -> None:
         self.connection = connection
 
+    @traced("ssh.start_container")
     async def start_container(self) -> str:
         result = await self.connection.run(
             "docker run -d --network=container:gluetun --rm ai-python tail -f /dev/null"
         )
         return result.stdout.strip()
 
+    @traced("ssh.stop_container")
     async def stop_container(self, container_id: str) -> None:
         await self.connection.run(f"docker stop {quote(container_id)}")
 
+    @traced("ssh.force_stop_container")
     async def force_stop_container(self, container_id: str) -> None:
         await self.connection.run(f"docker rm -f {quote(container_id)}")
 
+    @traced("ssh.exec_in_container")
     async def exec_in_container(self, container_id: str, cmd: str):
         safe_container_id = quote(container_id)
         safe_cmd = quote(cmd)
-        result = await self.connection.run(
-            f"docker exec {safe_container_id} python3 -c {safe_cmd}"
-        )
+        with container_exec_seconds.time(container="python"):
+            result = await self.connection.run(
+                f"docker exec {safe_container_id} python3 -c {safe_cmd}"
+            )
 
         return {
             "command": cmd,
@@ -62,6 +75,7 @@ class PythonContainer:
             "exit_code": result.exit_status,
         }
 
+    @traced("ssh.write_file_in_container")
     async def write_file_in_container(
         self, container_id: str, file_content: str, file_name: str = "script.py"
     ):
@@ -74,13 +88,15 @@ class PythonContainer:
             f"docker exec {safe_container_id} /bin/sh -c {quote(cmd)}"
         )
 
+    @traced("ssh.run_python_file")
     async def run_python_file(self, container_id: str, file_name: str = "script.py"):
         safe_container_id = quote(container_id)
         safe_file_name = quote(file_name)
 
-        result = await self.connection.run(
-            f"docker exec {safe_container_id} python3 {safe_file_name}"
-        )
+        with container_exec_seconds.time(container="python"):
+            result = await self.connection.run(
+                f"docker exec {safe_container_id} python3 {safe_file_name}"
+            )
 
         return {
             "command": f"python3 {file_name}",
@@ -0,0 +1,325 @@
+import asyncio
+import json
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from time import time
+from traceback import format_exc
+
+from utils.database import ContextDatabase
+
+# Rough flat cost of an image for vision models
+IMAGE_TOKENS = 768
+# Role and formatting overhead per message
+MESSAGE_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting without a tokenizer
+    return len(text) // 4 + 1
+
+
+def count_tokens(message: dict) -> int:
+    content = message.get("content") or ""
+    if isinstance(content, str):
+        return estimate_tokens(content) + MESSAGE_TOKENS
+
+    tokens = MESSAGE_TOKENS
+    for part in content:
+        if part.get("type") == "text":
+            tokens += estimate_tokens(part["text"])
+        else:
+            tokens += IMAGE_TOKENS
+    return tokens
+
+
+def system_messages(template: str) -> tuple:
+    # Time-sensitive lines go after the new turn, so everything before it stays
+    # byte-for-byte the same between turns and the backend can reuse its prompt cache
+    static = []
+    dynamic = []
+    for line in template.splitlines():
+        (dynamic if "{date}" in line else static).append(line)
+
+    prefix = [{"role": "system", "content": "\n".join(static).strip()}]
+    if not dynamic:
+        return prefix, []
+
+    date = datetime.utcnow().strftime("%Y-%m-%d")
+    suffix = [
+        {
+            "role": "system",
+            "content": "\n".join(dynamic).replace("{date}", date).strip(),
+        }
+    ]
+    return prefix, suffix
+
+
+class ContextStore:
+    def __init__(self, context_config: dict, database: ContextDatabase = None) -> None:
+        self.max_total_tokens = context_config.get("max_total_tokens", 500000)
+        self.reply_tokens = context_config.get("reply_tokens", 512)
+        self.budgets = context_config.get("budgets", {"default": 2048})
+        self.flush_interval = context_config.get("flush_interval", 5)
+        self.idle_seconds = context_config.get("idle_seconds", 1800)
+        # Fraction of the budget a window is trimmed down to once it overflows
+        self.window_trim = context_config.get("window_trim", 0.75)
+
+        # user ID -> [(message, token count)], least recently active first
+        self.histories = OrderedDict()
+        self.last_active = {}
+        self.total_tokens = 0
+        # user ID -> first history message of their last window
+        self.window_starts = {}
+
+        self.database = database
+        # user ID -> history waiting to be written, None deletes the user
+        self.dirty = {}
+        self.clear_all_pending = False
+        self.loading = {}
+        # user ID -> requests running for them, their history is never unloaded meanwhile
+        self.in_use = {}
+        self.flush_task = None
+        self.write_task = None
+
+    async def start(self) -> None:
+        if self.database and not self.flush_task:
+            self.flush_task = asyncio.create_task(self.flush_loop())
+
+    async def close(self) -> None:
+        if self.flush_task:
+            self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+        if self.database:
+            if self.write_task:
+                # A write the flush loop started keeps running in its thread, let it finish
+                try:
+                    await self.write_task
+                except Exception:
+                    # Its rows went back into dirty, the final flush retries them
+                    pass
+            await self.flush()
+            self.database.close()
+
+    @contextmanager
+    def pin(self, user_id: int):
+        # Appending to a history that was unloaded mid-request would start a new
+        # one and overwrite the stored rows with it
+        self.in_use[user_id] = self.in_use.get(user_id, 0) + 1
+        try:
+            yield
+        finally:
+            self.in_use[user_id] -= 1
+            if not self.in_use[user_id]:
+                del self.in_use[user_id]
+
+    async def load(self, user_id: int) -> None:
+        if user_id in self.histories:
+            self.histories.move_to_end(user_id)
+            self.last_active[user_id] = time()
+            return
+        if not self.database:
+            return
+
+        if user_id not in self.loading:
+            self.loading[user_id] = asyncio.create_task(self.load_user(user_id))
+        try:
+            await asyncio.shield(self.loading[user_id])
+        finally:
+            self.loading.pop(user_id, None)
+
+    async def load_user(self, user_id: int) -> None:
+        if user_id in self.dirty:
+            # Unloaded before its last write went out, the pending copy is newest
+            history = self.dirty[user_id]
+        else:
+            messages = await asyncio.to_thread(self.database.load, user_id)
+            history = [(message, count_tokens(message)) for message in messages or []]
+
+        if history and user_id not in self.histories:
+            self.histories[user_id] = history
+            self.last_active[user_id] = time()
+            self.total_tokens += sum(tokens for _, tokens in history)
+            self.evict(user_id)
+
+    def mark_dirty(self, user_id: int) -> None:
+        if self.database:
+            self.dirty[user_id] = self.histories.get(user_id)
+
+    async def flush(self) -> None:
+        if not self.dirty and not self.clear_all_pending:
+            return
+
+        rows = [
+            (
+                user_id,
+                (
+                    json.dumps([message for message, _ in history])
+                    if history is not None
+                    else None
+                ),
+            )
+            for user_id, history in self.dirty.items()
+        ]
+        pending = self.dirty
+        clear_all = self.clear_all_pending
+        self.dirty = {}
+        self.clear_all_pending = False
+
+        # Shielded so cancelling the flush loop doesn't abandon a running write
+        self.write_task = asyncio.create_task(self.write(pending, rows, clear_all))
+        await asyncio.shield(self.write_task)
+
+    async def write(self, pending: dict, rows: list, clear_all: bool) -> None:
+        try:
+            await asyncio.to_thread(self.database.write_many, rows, clear_all)
+        except Exception:
+            # Retried on the next flush, changes made since then win, a newer clear_all drops them
+            if not self.clear_all_pending:
+                self.dirty = {**pending, **self.dirty}
+            self.clear_all_pending = self.clear_all_pending or clear_all
+            raise
+
+    async def flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.unload_idle()
+                await self.flush()
+            except Exception:
+                print(format_exc())
+
+    def unload_idle(self) -> None:
+        # Persisted histories don't need to stay in memory once a user goes quiet
+        cutoff = time() - self.idle_seconds
+        for user_id in list(self.histories):
+            if self.last_active.get(user_id, 0) > cutoff:
+                break
+            if user_id not in self.in_use:
+                self.unload(user_id)
+
+    def unload(self, user_id: int) -> None:
+        history = self.histories.pop(user_id, [])
+        self.last_active.pop(user_id, None)
+        self.window_starts.pop(user_id, None)
+        self.total_tokens -= sum(tokens for _, tokens in history)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.histories
+
+    def __len__(self) -> int:
+        return len(self.histories)
+
+    def get(self, user_id: int) -> list:
+        return [message for message, _ in self.histories.get(user_id, [])]
+
+    def get_tokens(self, user_id: int) -> int:
+        return sum(tokens for _, tokens in self.histories.get(user_id, []))
+
+    def get_budget(self, model: str) -> int:
+        return self.budgets.get(model, self.budgets.get("default", 2048))
+
+    def get_summary(self, user_id: int):
+        # A compacted history starts with a single system summary message
+        history = self.histories.get(user_id, [])
+        if history and history[0][0]["role"] == "system":
+            return history[0][0]
+        return None
+
+    def window(self, user_id: int, budget: int) -> list:
+        history = self.histories.get(user_id, [])
+        summary = history[:1] if self.get_summary(user_id) else []
+        budget -= sum(tokens for _, tokens in summary)
+
+        # Keep starting where the last window did for as long as it fits, so the
+        # prompt only changes at the end and the backend's prefix cache stays valid
+        previous = self.window_starts.get(user_id)
+        start = next(
+            (i for i in range(len(summary), len(history)) if history[i][0] is previous),
+            len(summary),
+        )
+
+        if sum(tokens for _, tokens in history[start:]) > budget:
+            # Trim well under the budget so the next few turns fit without moving it
+            target = int(budget * self.window_trim)
+            start = len(history)
+            used = 0
+            while start > len(summary) and used + history[start - 1][1] <= target:
+                start -= 1
+                used += history[start][1]
+
+        # Never start the window on an orphaned assistant reply
+        while start < len(history) and history[start][0]["role"] == "assistant":
+            start += 1
+
+        if start < len(history):
+            self.window_starts[user_id] = history[start][0]
+
+        return [message for message, _ in summary + history[start:]]
+
+    def append(self, user_id: int, *messages: dict) -> None:
+        history = self.histories.setdefault(user_id, [])
+        for message in messages:
+            tokens = count_tokens(message)
+            history.append((message, tokens))
+            self.total_tokens += tokens
+
+        self.histories.move_to_end(user_id)
+        self.last_active[user_id] = time()
+        self.mark_dirty(user_id)
+        self.evict(user_id)
+
+    def replace_prefix(self, user_id: int, old_messages: list, message: dict):
+        history = self.histories.get(user_id, [])
+        if len(history) < len(old_messages) or any(
+            stored is not old for (stored, _), old in zip(history, old_messages)
+        ):
+            # The history was cleared or evicted while it was being compacted
+            return None
+
+        old_tokens = sum(tokens for _, tokens in history[: len(old_messages)])
+        tokens = count_tokens(message)
+        history[: len(old_messages)] = [(message, tokens)]
+        self.total_tokens += tokens - old_tokens
+        self.mark_dirty(user_id)
+
+        return old_tokens - tokens
+
+    def evict(self, active_user_id: int = None) -> None:
+        # Least recently active first, never the active user or one mid-request
+        while self.total_tokens > self.max_total_tokens:
+            user_id = next(
+                (
+                    user_id
+                    for user_id in self.histories
+                    if user_id != active_user_id and user_id not in self.in_use
+                ),
+                None,
+            )
+            if user_id is None:
+                break
+            self.unload(user_id)
+
+        # A single user can still be over the cap on their own
+        history = self.histories.get(active_user_id)
+        while history and self.total_tokens > self.max_total_tokens:
+            _, tokens = history.pop(0)
+            self.total_tokens -= tokens
+
+    def clear(self, user_id: int) -> None:
+        self.unload(user_id)
+        if self.database:
+            self.dirty[user_id] = None
+
+    def clear_all(self) -> None:
+        self.histories.clear()
+        self.last_active.clear()
+        self.window_starts.clear()
+        self.total_tokens = 0
+        if self.database:
+            self.dirty = {}
+            self.clear_all_pending = True
@@ -4,11 +4,20 @@ import discord
 from discord.ext import commands
 from openai import AsyncOpenAI
 
+from utils.cache import ResponseCache, make_key
 from utils.colorthief import get_color
-from utils.jsons import AIConfigJSON
+from utils.config import configs
+from utils.metrics import errors_total
+from utils.scheduler import RequestScheduler
 
 
-def add_context_commands(bot: commands.Bot, client: AsyncOpenAI, ai_config):
+def add_context_commands(
+    bot: commands.Bot,
+    client: AsyncOpenAI,
+    ai_config,
+    scheduler: RequestScheduler,
+    cache: ResponseCache,
+):
     @discord.app_commands.allowed_installs(guilds=True, users=True)
     @discord.app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
     @commands.cooldown(1, 10, commands.BucketType.user)
@@ -25,30 +34,41 @@ def add_context_commands(bot: commands.Bot, client: AsyncOpenAI, ai_config):
             return
 
         try:
-            prompt = [
-                {
-                    "role": "user",
-                    "content": [{"type": "text", "text": message.content}],
-                },
-            ]
+            model = ai_config["models"]["text"]
+            summary_prompt = configs.text("config/prompts/_general/summary.md")
+            cache_key = make_key(
+                "summary", model, summary_prompt.digest, message.id, message.edited_at
+            )
+            response = await cache.get(cache_key)
+            cache_hit = response is not None
+
+            if not cache_hit:
+                prompt = [
+                    {
+                        "role": "user",
+                        "content": [{"type": "text", "text": message.content}],
+                    },
+                ]
 
-            with open("config/prompts/_general/summary.md", "r") as f:
                 system_prompt = [
                     {
                         "role": "system",
-                        "content": f.read().strip(),
+                        "content": summary_prompt.data,
                     }
                 ]
-            full_prompt = system_prompt + prompt
+                full_prompt = system_prompt + prompt
 
-            completion = await client.chat.completions.create(
-                model=ai_config["models"]["text"],
-                messages=full_prompt,
-            )
-            response = completion.choices[0].message.content
+                async with scheduler.slot(
+                    interaction.user.id, RequestScheduler.INTERACTIVE
+                ):
+                    completion = await client.chat.completions.create(
+                        model=model,
+                        messages=full_prompt,
+                    )
+                response = completion.choices[0].message.content
+                await cache.set(cache_key, response)
 
-            ai_config["total_requests"] = ai_config["total_requests"] + 1
-            AIConfigJSON().write_json(ai_config)
+            bot.stats.increment()
 
             embed = discord.Embed(
                 title="Message Summary",
@@ -57,10 +77,11 @@ def add_context_commands(bot: commands.Bot, client: AsyncOpenAI, ai_config):
                 timestamp=datetime.now(),
             )
             embed.set_footer(
-                text=f"Request from {interaction.user.name}",
+                text=f"Request from {interaction.user.name} • {cache.format_stats(cache_hit)}",
                 icon_url=interaction.user.avatar.url,
             )
             await interaction.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
+            errors_total.inc(stage="summary")
             embed = discord.Embed(description=str(e), color=discord.Color.red())
             await interaction.followup.send(embed=embed, ephemeral=True)
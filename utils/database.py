@@ -0,0 +1,98 @@
+import json
+import sqlite3
+from threading import Lock
+from time import time
+
+
+class ContextDatabase:
+    def __init__(self, path: str = "config/context.db") -> None:
+        self.path = path
+        self.lock = Lock()
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS contexts ("
+            "user_id INTEGER PRIMARY KEY, messages TEXT NOT NULL, updated_at REAL NOT NULL"
+            ")"
+        )
+        self.connection.commit()
+
+    def load(self, user_id: int):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT messages FROM contexts WHERE user_id = ?", (user_id,)
+            ).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def write_many(self, rows: list, clear_all: bool = False) -> None:
+        # rows are (user ID, serialized messages), None messages delete the user
+        now = time()
+        with self.lock, self.connection:
+            if clear_all:
+                self.connection.execute("DELETE FROM contexts")
+            self.connection.executemany(
+                "DELETE FROM contexts WHERE user_id = ?",
+                [(user_id,) for user_id, messages in rows if messages is None],
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO contexts (user_id, messages, updated_at) VALUES (?, ?, ?)",
+                [
+                    (user_id, messages, now)
+                    for user_id, messages in rows
+                    if messages is not None
+                ],
+            )
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+class CacheDatabase:
+    def __init__(self, path: str = "config/cache.db", max_entries: int = 10000) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = Lock()
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL"
+            ")"
+        )
+        self.connection.commit()
+
+    def get(self, key: str):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?",
+                (key, time()),
+            ).fetchone()
+
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, key: str, value, expires_at: float) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+            # Drop expired rows, then the ones closest to expiring past the cap
+            self.connection.execute(
+                "DELETE FROM cache WHERE expires_at <= ?", (time(),)
+            )
+            self.connection.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entries,),
+            )
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
@@ -1,9 +1,15 @@
 import json
+import os
+from threading import RLock
+
+# Shared per path so every JSONObject for the same file writes one at a time
+locks = {}
 
 
 class JSONObject(object):
     def __init__(self, path: str) -> None:
         self.path = path  # TODO: not sure if pathlib is better but using str for now
+        self.lock = locks.setdefault(path, RLock())
 
     @staticmethod
     def __load__(data):
@@ -15,8 +21,12 @@ class JSONObject(object):
         return result
 
     def write_json(self, data) -> None:
-        with open(self.path, "w") as f:
-            json.dump(data, f, indent=4)
+        # Write next to the target and rename over it so readers never see a partial file
+        temp_path = f"{self.path}.tmp"
+        with self.lock:
+            with open(temp_path, "w") as f:
+                json.dump(data, f, indent=4)
+            os.replace(temp_path, self.path)
 
 
 class ConfigJSON(JSONObject):
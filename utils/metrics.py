@@ -0,0 +1,234 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from time import perf_counter
+
+from aiohttp import web
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def format_labels(names: tuple, values: tuple, extra: dict = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+
+    escaped = [
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in pairs
+    ]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Metric(ABC):
+    type = None
+
+    def __init__(self, name: str, description: str, labels: tuple = ()) -> None:
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values = {}
+
+    def key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    @abstractmethod
+    def samples(self):
+        pass
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{labels} {value}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self.key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, format_labels(self.labels, key), value
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, description: str, labels: tuple = ()) -> None:
+        super().__init__(name, description, labels)
+        self.functions = {}
+
+    def set(self, value: float, **labels) -> None:
+        self.values[self.key(labels)] = value
+
+    def set_function(self, function, **labels) -> None:
+        # Read at scrape time, for values that already live somewhere else
+        self.functions[self.key(labels)] = function
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, format_labels(self.labels, key), value
+        for key, function in self.functions.items():
+            yield self.name, format_labels(self.labels, key), function()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, description, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels) -> None:
+        key = self.key(labels)
+        # [count per bucket..., sum, count]
+        state = self.values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        before_time = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - before_time, **labels)
+
+    def samples(self):
+        for key, state in self.values.items():
+            for bound, count in zip(self.buckets, state):
+                yield (
+                    f"{self.name}_bucket",
+                    format_labels(self.labels, key, {"le": bound}),
+                    count,
+                )
+            yield (
+                f"{self.name}_bucket",
+                format_labels(self.labels, key, {"le": "+Inf"}),
+                state[-1],
+            )
+            yield f"{self.name}_sum", format_labels(self.labels, key), state[-2]
+            yield f"{self.name}_count", format_labels(self.labels, key), state[-1]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics = {}
+        self.runner = None
+
+    def register(self, metric: Metric) -> Metric:
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, description: str, labels: tuple = ()) -> Counter:
+        return self.register(Counter(name, description, labels))
+
+    def gauge(self, name: str, description: str, labels: tuple = ()) -> Gauge:
+        return self.register(Gauge(name, description, labels))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labels: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, description, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type="text/plain")
+
+    async def start(self, host: str = "127.0.0.1", port: int = 9100) -> None:
+        if self.runner:
+            return
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+
+    async def close(self) -> None:
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+# Shared by the whole bot, like the config service
+metrics = MetricsRegistry()
+
+requests_total = metrics.counter(
+    "nebula_requests_total", "Requests answered by the bot"
+)
+errors_total = metrics.counter(
+    "nebula_errors_total", "Requests that failed, by stage", ("stage",)
+)
+cache_lookups_total = metrics.counter(
+    "nebula_cache_lookups_total",
+    "Cache lookups by cache and result",
+    ("cache", "result"),
+)
+queue_depth = metrics.gauge(
+    "nebula_queue_depth", "LLM requests in the scheduler by state", ("state",)
+)
+
+routing_seconds = metrics.histogram(
+    "nebula_routing_seconds", "Time to pick a plugin for a message"
+)
+plugin_check_seconds = metrics.histogram(
+    "nebula_plugin_check_seconds", "Time spent in should_use_plugin", ("plugin",)
+)
+plugin_process_seconds = metrics.histogram(
+    "nebula_plugin_process_seconds", "Time spent in a plugin's process", ("plugin",)
+)
+llm_ttft_seconds = metrics.histogram(
+    "nebula_llm_ttft_seconds",
+    "Time to the first streamed chunk of an LLM response",
+    ("model", "backend"),
+)
+llm_request_seconds = metrics.histogram(
+    "nebula_llm_request_seconds",
+    "Time to a complete LLM response",
+    ("model", "backend"),
+    DEFAULT_BUCKETS + (120, 300),
+)
+discord_edit_seconds = metrics.histogram(
+    "nebula_discord_edit_seconds", "Time to edit a Discord message"
+)
+get_color_seconds = metrics.histogram(
+    "nebula_get_color_seconds", "Time to fetch an avatar and find its color"
+)
+transcription_seconds = metrics.histogram(
+    "nebula_transcription_seconds",
+    "Time to transcribe audio with Whisper",
+    ("source",),
+    DEFAULT_BUCKETS + (120, 300, 600),
+)
+scrape_seconds = metrics.histogram(
+    "nebula_scrape_seconds", "Time to fetch and parse a web page"
+)
+container_exec_seconds = metrics.histogram(
+    "nebula_container_exec_seconds",
+    "Time to run a command in a Docker container",
+    ("container",),
+)
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+from datetime import datetime
+from traceback import format_exc
+
+from aiohttp import ClientSession
+
+from utils.backends import Backend, BackendPool, normalize_model
+
+logger = logging.getLogger("NebulaAI")
+
+
+class ModelResidency:
+    def __init__(
+        self, pool: BackendPool, session: ClientSession, ai_config, residency_config
+    ) -> None:
+        self.pool = pool
+        self.session = session
+        self.ai_config = ai_config
+
+        self.enabled = residency_config.get("enabled", True)
+        self.keep_alive = residency_config.get("keep_alive", "30m")
+        # [start hour, end hour) in local time, wraps past midnight if start > end
+        self.active_hours = residency_config.get("active_hours", [0, 24])
+        self.refresh_interval = residency_config.get("refresh_interval", 60)
+
+        # backend URL -> {model name: /api/ps entry}
+        self.loaded = {}
+        # model name -> seconds the last warm-up spent loading it
+        self.load_times = {}
+        # "ttft"/"completion" -> "cold"/"warm" -> [requests, total seconds]
+        self.latency = {
+            "ttft": {"cold": [0, 0.0], "warm": [0, 0.0]},
+            "completion": {"cold": [0, 0.0], "warm": [0, 0.0]},
+        }
+
+        self.loop_task = None
+        self.warm_task = None
+        self.refresh_task = None
+
+    def models(self) -> list:
+        # The text model goes last so it wins if the backend can only hold one
+        text = normalize_model(self.ai_config["models"]["text"])
+        others = {normalize_model(model) for model in self.ai_config["models"].values()}
+        others.discard(text)
+        return sorted(others) + [text]
+
+    def is_active(self) -> bool:
+        start, end = self.active_hours
+        hour = datetime.now().hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def is_loaded(self, model: str) -> bool:
+        model = normalize_model(model)
+        return any(model in models for models in self.loaded.values())
+
+    async def start(self) -> None:
+        if self.enabled and not self.loop_task:
+            self.loop_task = asyncio.create_task(self.residency_loop())
+
+    async def close(self) -> None:
+        for task in (self.loop_task, self.warm_task, self.refresh_task):
+            if task:
+                task.cancel()
+        self.loop_task = None
+        self.warm_task = None
+        self.refresh_task = None
+
+    async def refresh(self, backend: Backend) -> None:
+        try:
+            async with self.session.get(
+                f"{backend.api_url}api/ps", timeout=5
+            ) as response:
+                response.raise_for_status()
+                ps = await response.json()
+            self.loaded[backend.url] = {model["name"]: model for model in ps["models"]}
+        except Exception:
+            self.loaded.pop(backend.url, None)
+
+    async def refresh_all(self) -> None:
+        await asyncio.gather(*(self.refresh(backend) for backend in self.pool.backends))
+
+    async def warm(self, backend: Backend, model: str) -> None:
+        # An empty generate request loads the model and resets its keep_alive timer
+        try:
+            async with self.session.post(
+                f"{backend.api_url}api/generate",
+                json={"model": model, "keep_alive": self.keep_alive},
+                timeout=300,
+            ) as response:
+                response.raise_for_status()
+                result = await response.json()
+        except Exception:
+            print(format_exc())
+            return
+
+        load_time = result.get("load_duration", 0) / 1e9
+        # Anything under a tenth of a second was already resident
+        if load_time >= 0.1:
+            self.load_times[model] = round(load_time, 3)
+            logger.info(f"Loaded {model} on {backend.url} in {load_time:.1f}s")
+
+    async def warm_all(self, load_missing: bool = True) -> None:
+        # Resident models get their keep_alive refreshed, missing ones are only
+        # loaded when asked to, so evicted models aren't swapped back in every interval
+        await self.refresh_all()
+        await asyncio.gather(
+            *(
+                self.warm_backend(backend, load_missing)
+                for backend in self.pool.backends
+                if backend.healthy
+            )
+        )
+        await self.refresh_all()
+
+    async def warm_backend(self, backend: Backend, load_missing: bool) -> None:
+        loaded = self.loaded.get(backend.url, {})
+        for model in self.models():
+            if backend.serves(model) and (load_missing or model in loaded):
+                await self.warm(backend, model)
+
+    def schedule_warm(self) -> None:
+        if not self.enabled:
+            return
+        if self.warm_task and not self.warm_task.done():
+            self.warm_task.cancel()
+        self.warm_task = asyncio.create_task(self.warm_all())
+
+    async def residency_loop(self) -> None:
+        # Let the pool's first probe fill in which backends serve which models
+        await self.pool.probe_all()
+        was_active = False
+        while True:
+            try:
+                active = self.is_active()
+                if active:
+                    # Models are loaded at startup and when active hours begin
+                    await self.warm_all(load_missing=not was_active)
+                else:
+                    await self.refresh_all()
+                was_active = active
+            except Exception:
+                print(format_exc())
+            await asyncio.sleep(self.refresh_interval)
+
+    def record(self, model: str, cold: bool, seconds: float, metric: str) -> None:
+        # metric is "ttft" for streamed responses, "completion" for whole ones
+        stats = self.latency[metric]["cold" if cold else "warm"]
+        stats[0] += 1
+        stats[1] += seconds
+        if cold and (self.refresh_task is None or self.refresh_task.done()):
+            # The request just loaded it, pick that up before the next one
+            self.refresh_task = asyncio.create_task(self.refresh_all())
+
+    def format_latency(self, metric: str, kind: str) -> str:
+        requests, total = self.latency[metric][kind]
+        if not requests:
+            return f"{kind}: no requests"
+        return f"{kind}: {round(total / requests, 3)}s average over {requests} requests"
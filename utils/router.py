@@ -0,0 +1,91 @@
+import asyncio
+from time import time
+from traceback import format_exc
+
+import discord
+
+from utils.metrics import errors_total, plugin_check_seconds, routing_seconds
+from utils.tracing import tracer
+
+
+class Routing:
+    # One message's routing, resumed below a claimed plugin that had nothing to add
+    def __init__(self, plugins: list, message: discord.Message, content: str) -> None:
+        self.plugins = plugins
+        self.message = message
+        self.content = content
+        self.position = 0
+
+        # plugin name -> check result and seconds, finished checks never run twice
+        self.results = {}
+        self.seconds = {}
+
+    @property
+    def timings(self) -> list:
+        # None marks a check that was cancelled before it finished
+        return [(plugin.name, self.seconds.get(plugin.name)) for plugin in self.plugins]
+
+    async def check(self, plugin):
+        before_time = time()
+        try:
+            with tracer.span("check", plugin=plugin.name):
+                result = await plugin.should_use_plugin(self.message, self.content)
+        except Exception:
+            print(format_exc())
+            errors_total.inc(stage="routing")
+            result = (False, None)
+
+        # Not reached when cancelled, so a later round checks the plugin again
+        self.results[plugin.name] = result
+        self.seconds[plugin.name] = round(time() - before_time, 3)
+        plugin_check_seconds.observe(time() - before_time, plugin=plugin.name)
+        return result
+
+    async def next(self):
+        with routing_seconds.time(), tracer.span("route"):
+            return await self.claim()
+
+    async def claim(self):
+        plugins = self.plugins[self.position :]
+        tasks = {
+            plugin.name: asyncio.create_task(self.check(plugin))
+            for plugin in plugins
+            if plugin.name not in self.results
+        }
+
+        try:
+            for plugin in plugins:
+                self.position += 1
+                if plugin.name in self.results:
+                    should_use, confidence = self.results[plugin.name]
+                else:
+                    should_use, confidence = await tasks[plugin.name]
+
+                if should_use:
+                    return plugin, confidence
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+        return None, None
+
+
+class PluginRouter:
+    def __init__(self, plugins: list) -> None:
+        # Plugins are checked concurrently but claimed in list order
+        self.plugins = plugins
+
+    def route(self, message: discord.Message, content: str) -> Routing:
+        return Routing(self.plugins, message, content)
+
+
+def format_timings(timings: list) -> str:
+    if not timings:
+        return ""
+
+    parts = [
+        f"{name} {'cancelled' if seconds is None else f'{seconds}s'}"
+        for name, seconds in timings
+    ]
+    return f"routing {', '.join(parts)}"
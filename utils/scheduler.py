@@ -0,0 +1,130 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+from utils.tracing import tracer
+
+
+class Job:
+    def __init__(self, lane: tuple, on_position=None) -> None:
+        self.lane = lane
+        self.on_position = on_position
+        self.position = None
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class RequestScheduler:
+    # Lower runs first
+    INTERACTIVE = 0
+    CHAT = 1
+    # Work nobody is waiting on, like context compaction
+    BACKGROUND = 2
+
+    def __init__(self, max_concurrent: int = 2) -> None:
+        self.max_concurrent = max_concurrent
+        self.running = 0
+
+        # Each (priority, user ID) lane is FIFO and runs one job at a time
+        self.queues = {}
+        self.running_lanes = set()
+        # Lanes with waiting jobs and none running, in round-robin order
+        self.rotation = deque()
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    @asynccontextmanager
+    async def slot(self, user_id: int, priority: int = CHAT, on_position=None):
+        job = Job((priority, user_id), on_position)
+        self.queues.setdefault(job.lane, deque()).append(job)
+        if job.lane not in self.rotation and job.lane not in self.running_lanes:
+            self.rotation.append(job.lane)
+        self.dispatch()
+
+        try:
+            with tracer.span("queue"):
+                await job.future
+        except asyncio.CancelledError:
+            if job.future.cancelled():
+                self.remove(job)
+            else:
+                self.release(job.lane)
+            raise
+
+        try:
+            yield
+        finally:
+            self.release(job.lane)
+
+    def remove(self, job: Job) -> None:
+        queue = self.queues.get(job.lane)
+        if queue and job in queue:
+            queue.remove(job)
+            if not queue:
+                del self.queues[job.lane]
+                if job.lane in self.rotation:
+                    self.rotation.remove(job.lane)
+        self.dispatch()
+
+    def release(self, lane: tuple) -> None:
+        self.running -= 1
+        self.running_lanes.discard(lane)
+        if lane in self.queues:
+            # Back in line behind the lanes that waited while it ran
+            self.rotation.append(lane)
+        self.dispatch()
+
+    def next_job(self):
+        if not self.rotation:
+            return None
+
+        priority = min(lane[0] for lane in self.rotation)
+        lane = next(lane for lane in self.rotation if lane[0] == priority)
+        # The lane sits out of the rotation until its job is released
+        self.rotation.remove(lane)
+
+        queue = self.queues[lane]
+        job = queue.popleft()
+        if not queue:
+            del self.queues[lane]
+        return job
+
+    def dispatch(self) -> None:
+        while self.running < self.max_concurrent:
+            job = self.next_job()
+            if job is None:
+                break
+
+            self.running += 1
+            self.running_lanes.add(job.lane)
+            job.future.set_result(None)
+            if job.position is not None:
+                # Tell anyone that saw a queue position that the job started
+                self.notify(job, 0)
+
+        self.update_positions()
+
+    def update_positions(self) -> None:
+        # Replay the round-robin over a copy of the queues to get each job's turn
+        queues = {lane: list(queue) for lane, queue in self.queues.items()}
+        # Running lanes rejoin at the end once their job is released
+        order = list(self.rotation) + [
+            lane for lane in self.queues if lane not in self.rotation
+        ]
+        position = 0
+        for priority in sorted({lane[0] for lane in order}):
+            lanes = [lane for lane in order if lane[0] == priority]
+            while lanes:
+                for lane in list(lanes):
+                    job = queues[lane].pop(0)
+                    position += 1
+                    if job.position != position:
+                        self.notify(job, position)
+                    if not queues[lane]:
+                        lanes.remove(lane)
+
+    def notify(self, job: Job, position: int) -> None:
+        job.position = position
+        if job.on_position:
+            asyncio.create_task(job.on_position(position))
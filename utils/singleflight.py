@@ -0,0 +1,51 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from utils.metrics import cache_lookups_total
+
+
+class CoalescingClient:
+    def __init__(self, client) -> None:
+        self.client = client
+        # Mirrors client.chat.completions.create so call sites don't change
+        self.chat = SimpleNamespace(completions=self)
+
+        # request key -> [backend task, number of waiters]
+        self.in_flight = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def create(self, **kwargs):
+        # Streams can only be read once, so they are never shared
+        if kwargs.get("stream"):
+            return await self.client.chat.completions.create(**kwargs)
+
+        key = json.dumps(kwargs, sort_keys=True, default=str)
+        entry = self.in_flight.get(key)
+        if entry is None:
+            self.misses += 1
+            cache_lookups_total.inc(cache="coalescing", result="miss")
+            task = asyncio.create_task(self.client.chat.completions.create(**kwargs))
+            entry = [task, 0]
+            self.in_flight[key] = entry
+            task.add_done_callback(lambda _: self.forget(key, entry))
+        else:
+            self.hits += 1
+            cache_lookups_total.inc(cache="coalescing", result="hit")
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            entry[1] -= 1
+            # Only cancel the backend call once nobody is waiting on it anymore
+            if entry[1] == 0 and not task.done():
+                # Forgotten right away, a new caller must not join the cancelled task
+                self.forget(key, entry)
+                task.cancel()
+
+    def forget(self, key: str, entry: list) -> None:
+        if self.in_flight.get(key) is entry:
+            del self.in_flight[key]
@@ -0,0 +1,87 @@
+import asyncio
+import importlib
+import logging
+import sys
+from contextlib import contextmanager
+from time import perf_counter
+
+logger = logging.getLogger("NebulaAI")
+
+
+class StartupReport:
+    def __init__(self) -> None:
+        self.started = perf_counter()
+        self.finished = None
+        # name -> seconds, in the order they started
+        self.phases = {}
+        self.imports = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        before_time = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = perf_counter() - before_time
+
+    def record_import(self, name: str, seconds: float) -> None:
+        self.imports[name] = seconds
+        if self.finished is not None:
+            logger.info(f"Imported {name} on first use in {round(seconds, 3)}s")
+
+    def finish(self) -> None:
+        self.finished = perf_counter()
+        logger.info(self.format())
+
+    def format(self) -> str:
+        total = (self.finished or perf_counter()) - self.started
+        lines = [f"Started in {round(total, 3)}s"]
+        lines += [
+            f"  {name}: {round(seconds, 3)}s" for name, seconds in self.phases.items()
+        ]
+        if self.imports:
+            lines.append("Deferred imports:")
+            lines += [
+                f"  {name}: {round(seconds, 3)}s"
+                for name, seconds in sorted(
+                    self.imports.items(), key=lambda item: item[1], reverse=True
+                )
+            ]
+        return "\n".join(lines)
+
+
+# Created when main.py first imports it, so the report covers the whole startup
+startup = StartupReport()
+
+
+# module name -> the import running for it, or finished
+importing = {}
+
+
+def lazy_import(name: str):
+    # Heavy dependencies are imported by the feature that needs them, the first time it runs.
+    # import_module waits for another thread's import of the same module to finish,
+    # sys.modules alone can hold a module that is still initializing
+    imported = name in sys.modules
+    before_time = perf_counter()
+    module = importlib.import_module(name)
+    if not imported:
+        startup.record_import(name, perf_counter() - before_time)
+    return module
+
+
+async def lazy_import_async(name: str):
+    # For request paths, the first import runs in a thread instead of blocking the event loop,
+    # concurrent callers share it
+    task = importing.get(name)
+    if task is None:
+        task = importing[name] = asyncio.create_task(
+            asyncio.to_thread(lazy_import, name)
+        )
+    try:
+        return await asyncio.shield(task)
+    except Exception:
+        # Let the next caller retry a failed import
+        if importing.get(name) is task:
+            del importing[name]
+        raise
@@ -0,0 +1,48 @@
+import asyncio
+from traceback import format_exc
+
+from utils.config import configs
+from utils.metrics import requests_total
+
+
+class RequestStats:
+    def __init__(self, flush_interval: float = 60) -> None:
+        self.flush_interval = flush_interval
+        self.ai_config = configs.json("config/ai.json")
+
+        self.total = self.ai_config["total_requests"]
+        self.flushed_total = self.total
+
+        self.lock = asyncio.Lock()
+        self.flush_task = None
+
+    def increment(self, amount: int = 1) -> None:
+        self.total += amount
+        requests_total.inc(amount)
+
+    async def start(self) -> None:
+        if not self.flush_task:
+            self.flush_task = asyncio.create_task(self.flush_loop())
+
+    async def close(self) -> None:
+        if self.flush_task:
+            self.flush_task.cancel()
+            self.flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self.lock:
+            total = self.total
+            if total == self.flushed_total:
+                return
+
+            await self.ai_config.update(lambda data: data.update(total_requests=total))
+            self.flushed_total = total
+
+    async def flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                print(format_exc())
@@ -0,0 +1,84 @@
+import asyncio
+from time import monotonic
+from traceback import format_exc
+
+import discord
+
+from utils.metrics import discord_edit_seconds
+from utils.tracing import tracer
+
+
+class MessageStatus:
+    def __init__(self, message) -> None:
+        self.message = message
+        # Edit kwargs of the newest state that hasn't been applied yet
+        self.kwargs = None
+        self.last_edit = 0
+        self.task = None
+        self.lock = asyncio.Lock()
+
+
+class StatusCoalescer:
+    def __init__(self, interval: float = 1.0) -> None:
+        # Minimum time between two intermediate edits of the same message
+        self.interval = interval
+        self.statuses = {}
+
+    def update(self, message, **kwargs) -> None:
+        # Intermediate states replace each other, only the newest one is sent
+        self.prune()
+        status = self.statuses.setdefault(message.id, MessageStatus(message))
+        status.kwargs = kwargs
+        if status.task is None:
+            status.task = asyncio.create_task(self.apply_later(status))
+
+    async def flush(self, message, **kwargs):
+        # Final states drop anything still waiting and are always sent, in order
+        status = self.statuses.pop(message.id, None)
+        if status is None:
+            return await self.edit(message, **kwargs)
+
+        if status.task:
+            status.task.cancel()
+            status.task = None
+        async with status.lock:
+            return await self.edit(message, **kwargs)
+
+    def cancel(self, message) -> None:
+        status = self.statuses.pop(message.id, None)
+        if status and status.task:
+            status.task.cancel()
+
+    async def apply_later(self, status: MessageStatus) -> None:
+        # An edit still in flight moves last_edit, so the delay is measured after it
+        async with status.lock:
+            delay = max(0, status.last_edit + self.interval - monotonic())
+        await asyncio.sleep(delay)
+        # Past this point flush waits for the edit instead of cancelling it
+        status.task = None
+        kwargs = status.kwargs
+        status.kwargs = None
+
+        async with status.lock:
+            try:
+                await self.edit(status.message, **kwargs)
+            except discord.HTTPException:
+                pass
+            except Exception:
+                print(format_exc())
+            status.last_edit = monotonic()
+
+    async def edit(self, message, **kwargs):
+        with discord_edit_seconds.time(), tracer.span("discord.edit"):
+            return await message.edit(**kwargs)
+
+    def prune(self) -> None:
+        # Forget idle messages that never got a final state
+        cutoff = monotonic() - self.interval * 10
+        for message_id, status in list(self.statuses.items()):
+            if status.task is None and status.last_edit and status.last_edit < cutoff:
+                del self.statuses[message_id]
+
+
+# Shared by the AI cog and every plugin so they agree on the last state of a message
+status = StatusCoalescer()
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter, time
+from traceback import format_exc
+from uuid import uuid4
+
+current_span = ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, parent, attributes: dict) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid4().hex
+        self.span_id = uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start = time()
+        self.before_time = perf_counter()
+        self.duration = None
+        self.error = None
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.path = "traces.jsonl"
+        self.max_bytes = 10 * 1024 * 1024
+        self.backups = 3
+        self.export_interval = 5
+
+        # trace ID -> finished spans, for traces whose root is still running
+        self.active = {}
+        # Finished traces as (root span, spans), oldest first
+        self.recent = deque(maxlen=200)
+        self.pending = []
+        self.export_task = None
+
+    def configure(self, tracing_config) -> None:
+        self.enabled = tracing_config.get("enabled", False)
+        self.path = tracing_config.get("path", "traces.jsonl")
+        self.max_bytes = tracing_config.get("max_bytes", 10 * 1024 * 1024)
+        self.backups = tracing_config.get("backups", 3)
+        self.export_interval = tracing_config.get("export_interval", 5)
+        self.recent = deque(self.recent, maxlen=tracing_config.get("keep_recent", 200))
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        if not self.enabled:
+            yield None
+            return
+
+        span = Span(name, current_span.get(), attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            current_span.reset(token)
+            span.duration = round(perf_counter() - span.before_time, 4)
+            self.finish(span)
+
+    def finish(self, span: Span) -> None:
+        self.pending.append(span)
+        # Spans outside a trace, or that outlive its root, are only exported
+        spans = self.active.get(span.trace_id)
+        if spans is None:
+            return
+
+        spans.append(span)
+        if span.parent_id is None:
+            del self.active[span.trace_id]
+            self.recent.append((span, spans))
+
+    def start_trace(self, span: Span) -> None:
+        self.active[span.trace_id] = []
+
+    async def start(self) -> None:
+        if self.enabled and not self.export_task:
+            self.export_task = asyncio.create_task(self.export_loop())
+
+    async def close(self) -> None:
+        if self.export_task:
+            self.export_task.cancel()
+            self.export_task = None
+        await self.export()
+
+    async def export(self) -> None:
+        if not self.pending:
+            return
+
+        lines = [json.dumps(span.to_dict(), default=str) for span in self.pending]
+        self.pending = []
+        await asyncio.to_thread(self.write, lines)
+
+    async def export_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.export_interval)
+            try:
+                await self.export()
+            except Exception:
+                print(format_exc())
+
+    def write(self, lines: list) -> None:
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self.rotate()
+
+        with open(self.path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def rotate(self) -> None:
+        # traces.jsonl -> traces.jsonl.1 -> ... -> traces.jsonl.<backups>, oldest dropped
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def slowest(self, count: int = 5) -> list:
+        return sorted(self.recent, key=lambda trace: trace[0].duration, reverse=True)[
+            :count
+        ]
+
+
+def format_trace(root: Span, spans: list) -> str:
+    children = OrderedDict()
+    for span in sorted(spans, key=lambda span: span.start):
+        children.setdefault(span.parent_id, []).append(span)
+
+    lines = []
+
+    def add(span: Span, depth: int) -> None:
+        attributes = " ".join(
+            f"{key}={value}" for key, value in span.attributes.items()
+        )
+        error = f" !{span.error}" if span.error else ""
+        lines.append(
+            f"{'  ' * depth}{span.name} {span.duration}s{error} {attributes}".rstrip()
+        )
+        for child in children.get(span.span_id, []):
+            add(child, depth + 1)
+
+    add(root, 0)
+    return "\n".join(lines)
+
+
+# Shared by the whole bot, like the metrics registry
+tracer = Tracer()
+
+
+@contextmanager
+def trace(name: str, **attributes):
+    # Starts a new trace, the spans opened inside it are kept with it for the owner command
+    token = current_span.set(None)
+    try:
+        with tracer.span(name, **attributes) as span:
+            if span:
+                tracer.start_trace(span)
+            yield span
+    finally:
+        current_span.reset(token)
+
+
+def traced(name: str):
+    def decorator(function):
+        @wraps(function)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return await function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,2 @@
+from .audio import decode_audio
+from .service import TranscriptionQueueFull, TranscriptionService
@@ -0,0 +1,51 @@
+import asyncio
+
+from utils.startup import lazy_import_async
+
+SAMPLE_RATE = 16000
+
+
+async def decode_audio(content: bytes, sample_rate: int = SAMPLE_RATE):
+    # Whisper's input format, mono float32 PCM, decoded without touching the disk
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg",
+        "-loglevel",
+        "error",
+        "-i",
+        "pipe:0",
+        "-f",
+        "f32le",
+        "-ac",
+        "1",
+        "-ar",
+        str(sample_rate),
+        "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    async def feed():
+        try:
+            process.stdin.write(content)
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg gave up on the input, its error is read from stderr below
+            pass
+        finally:
+            process.stdin.close()
+
+    try:
+        _, output, error = await asyncio.gather(
+            feed(), process.stdout.read(), process.stderr.read()
+        )
+        await process.wait()
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"Failed to decode audio: {error.decode().strip()}")
+    np = await lazy_import_async("numpy")
+    return np.frombuffer(output, np.float32)
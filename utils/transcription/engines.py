@@ -0,0 +1,65 @@
+from abc import ABC, abstractmethod
+
+
+class TranscriptionEngine(ABC):
+    name = "Unknown"
+
+    def __init__(self, engine_config) -> None:
+        self.model_name = engine_config.get("model", "base")
+        self.model = None
+
+    @abstractmethod
+    def load(self) -> None:
+        pass
+
+    @abstractmethod
+    def transcribe(self, audio) -> dict:
+        pass
+
+
+class WhisperEngine(TranscriptionEngine):
+    name = "whisper"
+
+    def load(self) -> None:
+        import whisper
+
+        self.model = whisper.load_model(self.model_name)
+
+    def transcribe(self, audio) -> dict:
+        return {"text": self.model.transcribe(audio)["text"]}
+
+
+class FasterWhisperEngine(TranscriptionEngine):
+    name = "faster-whisper"
+
+    def __init__(self, engine_config) -> None:
+        super().__init__(engine_config)
+        # int8 keeps CPU inference several times faster than fp32 at almost no accuracy cost
+        self.compute_type = engine_config.get("compute_type", "int8")
+        self.threads = engine_config.get("threads", 0)
+        self.beam_size = engine_config.get("beam_size", 5)
+
+    def load(self) -> None:
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            self.model_name,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.threads,
+        )
+
+    def transcribe(self, audio) -> dict:
+        segments, _ = self.model.transcribe(audio, beam_size=self.beam_size)
+        # Segments are generated lazily, joining them is what runs the model
+        return {"text": "".join(segment.text for segment in segments)}
+
+
+engines = {engine.name: engine for engine in (WhisperEngine, FasterWhisperEngine)}
+
+
+def make_engine(engine_config) -> TranscriptionEngine:
+    name = engine_config.get("engine", "whisper")
+    if name not in engines:
+        raise ValueError(f"Unknown transcription engine: {name}")
+    return engines[name](engine_config)
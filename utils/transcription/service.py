@@ -0,0 +1,271 @@
+import asyncio
+import heapq
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from itertools import count
+from multiprocessing import get_context
+from time import monotonic
+from traceback import format_exc
+
+from utils.cache import ResponseCache, make_key
+from utils.config import thaw
+from utils.database import CacheDatabase
+from utils.metrics import transcription_seconds
+from utils.tracing import tracer
+
+from .engines import make_engine
+from .worker import load_engine, transcribe_audio, warm_up
+
+
+class TranscriptionQueueFull(Exception):
+    pass
+
+
+class TranscriptionJob:
+    def __init__(self, priority: int, sequence: int, audio, on_position) -> None:
+        self.priority = priority
+        self.sequence = sequence
+        self.audio = audio
+        self.on_position = on_position
+        self.position = None
+        self.future = asyncio.get_running_loop().create_future()
+
+    def __lt__(self, other) -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class TranscriptionService:
+    # Lower runs first, short voice notes shouldn't wait behind whole videos
+    VOICE = 0
+    YOUTUBE = 1
+    SOURCES = {VOICE: "voice_message", YOUTUBE: "youtube"}
+    # The only settings the worker processes need to build their engine
+    ENGINE_KEYS = ("engine", "model", "compute_type", "threads", "beam_size")
+
+    def __init__(self, transcription_config) -> None:
+        self.workers = transcription_config.get("workers", 2)
+        # Built here too so a typo in the engine name fails at startup, not in a worker
+        self.engine = make_engine(transcription_config)
+        self.engine_config = {
+            key: thaw(transcription_config[key])
+            for key in self.ENGINE_KEYS
+            if key in transcription_config
+        }
+        # Sent to spawned workers, a config that can't be pickled fails here instead
+        pickle.dumps(self.engine_config)
+        # Jobs allowed to wait for a worker before new ones are turned away
+        self.max_queue = transcription_config.get("max_queue", 20)
+        # Workers and their models are shut down after this many idle seconds
+        self.idle_unload = transcription_config.get("idle_unload", 900)
+        # Hours in which the model is kept loaded ahead of any voice message, like [8, 24]
+        self.preload_hours = transcription_config.get("preload_hours")
+        self.check_interval = transcription_config.get("check_interval", 60)
+
+        cache_config = transcription_config.get("cache", {})
+        cache_database_path = cache_config.get("database", "config/transcripts.db")
+        self.cache = ResponseCache(
+            cache_config.get("max_entries", 512),
+            cache_config.get("ttl", 30 * 86400),
+            CacheDatabase(cache_database_path) if cache_database_path else None,
+            name="transcript",
+        )
+
+        self.pool = None
+        self.waiting = []
+        self.running = 0
+        self.sequence = count()
+        self.last_used = monotonic()
+        self.loaded_at = None
+        self.task = None
+
+    def start(self) -> None:
+        # The model itself is only loaded when it's first needed or preloaded
+        if self.task is None:
+            self.task = asyncio.create_task(self.idle_loop())
+
+    def start_pool(self) -> None:
+        self.last_used = monotonic()
+        if self.pool:
+            return
+
+        # Spawned, not forked, so the workers don't inherit the bot's event loop and sockets
+        self.pool = ProcessPoolExecutor(
+            self.workers,
+            mp_context=get_context("spawn"),
+            initializer=load_engine,
+            initargs=(self.engine_config,),
+        )
+
+    async def close(self) -> None:
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        for job in self.waiting:
+            job.future.cancel()
+        self.waiting = []
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        self.loaded_at = None
+        self.cache.close()
+
+    def is_preload_time(self) -> bool:
+        if not self.preload_hours:
+            return False
+        start, end = self.preload_hours
+        hour = datetime.now().hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def is_idle(self) -> bool:
+        return (
+            not self.running
+            and not self.waiting
+            and monotonic() - self.last_used > self.idle_unload
+        )
+
+    async def preload(self) -> None:
+        self.start_pool()
+        pool = self.pool
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(
+                *(loop.run_in_executor(pool, warm_up) for _ in range(self.workers))
+            )
+        except BrokenProcessPool:
+            self.discard_pool(pool)
+            raise
+        if self.loaded_at is None:
+            self.loaded_at = monotonic()
+
+    def unload(self) -> None:
+        if self.pool:
+            self.pool.shutdown(wait=False)
+            self.pool = None
+        self.loaded_at = None
+
+    def discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        # A worker died (out of memory, a crash in the engine) and the executor
+        # refuses every later job, the next one starts a new pool instead
+        if pool is self.pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+            self.loaded_at = None
+
+    async def idle_loop(self) -> None:
+        while True:
+            try:
+                if self.is_preload_time():
+                    if self.pool is None:
+                        await self.preload()
+                    self.last_used = monotonic()
+                elif self.pool and self.is_idle():
+                    self.unload()
+            except Exception:
+                print(format_exc())
+            await asyncio.sleep(self.check_interval)
+
+    def memory(self) -> int:
+        # Resident memory of the worker processes in bytes, Linux only
+        total = 0
+        processes = (self.pool and self.pool._processes) or {}
+        for process in list(processes.values()):
+            try:
+                with open(f"/proc/{process.pid}/statm") as statm:
+                    total += int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            except (OSError, ValueError):
+                pass
+        return total
+
+    def format_state(self) -> str:
+        if self.pool is None:
+            return "unloaded"
+        processes = len((self.pool._processes) or {})
+        state = f"{processes}/{self.workers} workers, {round(self.memory() / 2**20)} MB resident"
+        if self.loaded_at is None:
+            return f"{state}, loading"
+        return f"{state}, idle for {round(monotonic() - self.last_used)}s"
+
+    def cache_key(self, source: str, identifier: str) -> str:
+        # Another engine or model size gives a different transcript
+        return make_key(source, identifier, self.engine.name, self.engine.model_name)
+
+    async def cached(self, key: str):
+        # Callers look up first, transcribe() only stores the result under key
+        return await self.cache.get(key)
+
+    async def transcribe(
+        self, audio, priority: int = VOICE, on_position=None, key: str = None
+    ) -> dict:
+        if len(self.waiting) >= self.max_queue:
+            raise TranscriptionQueueFull()
+
+        self.start_pool()
+        job = TranscriptionJob(priority, next(self.sequence), audio, on_position)
+        heapq.heappush(self.waiting, job)
+        self.dispatch()
+
+        with tracer.span(
+            "transcribe", source=self.SOURCES[priority], engine=self.engine.name
+        ):
+            try:
+                result = await job.future
+            except asyncio.CancelledError:
+                if job in self.waiting:
+                    self.waiting.remove(job)
+                    heapq.heapify(self.waiting)
+                    self.update_positions()
+                raise
+
+        if key:
+            await self.cache.set(key, result)
+        return result
+
+    def dispatch(self) -> None:
+        while self.running < self.workers and self.waiting:
+            job = heapq.heappop(self.waiting)
+            self.running += 1
+            if job.position is not None:
+                self.notify(job, 0)
+            asyncio.create_task(self.run(job))
+
+        self.update_positions()
+
+    async def run(self, job: TranscriptionJob) -> None:
+        # A job queued while the pool was discarded starts a fresh one
+        self.start_pool()
+        pool = self.pool
+        try:
+            with transcription_seconds.time(source=self.SOURCES[job.priority]):
+                result = await asyncio.get_running_loop().run_in_executor(
+                    pool, transcribe_audio, job.audio
+                )
+            if self.loaded_at is None:
+                self.loaded_at = monotonic()
+            if not job.future.done():
+                job.future.set_result(result)
+        except BrokenProcessPool as e:
+            self.discard_pool(pool)
+            if not job.future.done():
+                job.future.set_exception(e)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            self.running -= 1
+            self.last_used = monotonic()
+            self.dispatch()
+
+    def update_positions(self) -> None:
+        for position, job in enumerate(sorted(self.waiting), start=1):
+            if job.position != position:
+                self.notify(job, position)
+
+    def notify(self, job: TranscriptionJob, position: int) -> None:
+        job.position = position
+        if job.on_position:
+            asyncio.create_task(job.on_position(position))
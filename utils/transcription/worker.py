@@ -0,0 +1,20 @@
+# Runs inside the transcription worker processes, each one keeps its own engine
+from .engines import make_engine
+
+engine = None
+
+
+def load_engine(engine_config) -> None:
+    global engine
+    engine = make_engine(engine_config)
+    engine.load()
+
+
+def warm_up() -> bool:
+    # Submitted once per worker so the pool spawns them and the initializer loads the model
+    return engine is not None
+
+
+def transcribe_audio(audio) -> dict:
+    # A file path, or 16 kHz mono float32 samples
+    return engine.transcribe(audio)